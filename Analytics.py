@@ -0,0 +1,132 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Pulse_tables import TABLES_BY_NAME
+from Query_cache import data_version
+from Rollups import rollup_name, summed_columns
+from Typed_frames import fact_frame, state_rollup_frame
+
+# trend analytics over the fact tables, computed in one vectorized pass per
+# table and level from a shared typed frame: the national and state levels
+# from the <table>_by_state rollup (Typed_frames.state_rollup_frame), only the
+# area level reads the raw rows (Typed_frames.fact_frame):
+#   <m>_qoq / <m>_yoy      growth vs the previous quarter / same quarter a year ago
+#   <m>_ma4                average of the quarters present among the last 4
+#   <m>_share              share of the quarter's national total
+#   <m>_rank / _rank_change  rank within the quarter, places gained since last quarter
+# plus cagr() per group and yearly() totals. Results are kept per data
+# version, so the dashboard computes them once per load, not per request.
+
+# level -> grouping columns (besides the period), "area" is the table's area column
+LEVELS = {
+    "national": [],
+    "state": ["state"],
+    "area": ["state", "area"],
+}
+
+_results = {}
+_results_lock = threading.Lock()
+
+
+def _keys(spec, level):
+    return [spec["area"] if col == "area" else col for col in LEVELS[level]]
+
+
+def _sources(table, level):
+    # the relations a level is computed from, its results are kept per their version
+    return [table if level == "area" else rollup_name(table, "by_state"), "dim_state"]
+
+
+def period_label(year, quarter):
+    return year.astype(str) + " Q" + quarter.astype(str)
+
+
+def _aggregate(table, level):
+    spec = TABLES_BY_NAME[table]
+    keys, measures = _keys(spec, level), summed_columns(spec)
+    df = fact_frame(table) if level == "area" else state_rollup_frame(table)
+    df = df.groupby(keys + ["year", "quater"], observed=True, as_index=False)[measures].sum()
+    # consecutive quarter number, the lags below are looked up on it
+    df["period"] = df["year"].astype("int32") * 4 + df["quater"].astype("int32") - 1
+    df["period_label"] = period_label(df["year"], df["quater"])
+    return df.sort_values(keys + ["period"]).reset_index(drop=True), keys, measures
+
+
+def _lagged(df, keys, columns, lag):
+    # the columns of the same group `lag` quarters earlier, aligned on df's
+    # rows; NaN where that quarter is missing (a gap is not a previous quarter)
+    previous = df[keys + ["period"] + columns].copy()
+    previous["period"] += lag
+    return df[keys + ["period"]].merge(previous, on=keys + ["period"], how="left")[columns]
+
+
+def compute_trends(table, level="state"):
+    # every trend column of one table and level, one row per group x quarter
+    df, keys, measures = _aggregate(table, level)
+    period_totals = df.groupby("period")[measures].transform("sum")
+
+    # the 3 previous quarters aligned on the period, a missing quarter is
+    # left out of the moving average instead of reaching further back
+    earlier = [_lagged(df, keys, measures, lag) for lag in (1, 2, 3)]
+    for m in measures:
+        values = df[m].astype("float64")
+        df[f"{m}_ma4"] = pd.concat([values] + [lagged[m] for lagged in earlier], axis=1).mean(axis=1)
+        df[f"{m}_share"] = values / period_totals[m].replace(0, np.nan)
+        if keys:
+            df[f"{m}_rank"] = df.groupby("period")[m].rank(method="min", ascending=False).astype("int32")
+
+    previous_q = _lagged(df, keys, measures + [f"{m}_rank" for m in measures if keys], 1)
+    previous_y = _lagged(df, keys, measures, 4)
+    for m in measures:
+        df[f"{m}_qoq"] = df[m] / previous_q[m].replace(0, np.nan) - 1
+        df[f"{m}_yoy"] = df[m] / previous_y[m].replace(0, np.nan) - 1
+        if keys:
+            # positive: places gained since the previous quarter
+            df[f"{m}_rank_change"] = previous_q[f"{m}_rank"] - df[f"{m}_rank"]
+    return df
+
+
+def cagr(trends, keys, measure):
+    # compound annual growth per group between its first and last quarter
+    if not keys:
+        trends, keys = trends.assign(scope="india"), ["scope"]
+    groups = trends.groupby(keys, observed=True)
+    first, last = groups[[measure, "period"]].first(), groups[[measure, "period"]].last()
+    years = (last["period"] - first["period"]) / 4
+    growth = (last[measure] / first[measure].replace(0, np.nan)) ** (1 / years.replace(0, np.nan)) - 1
+    return pd.DataFrame({"first": first[measure], "last": last[measure], "years": years,
+                         f"{measure}_cagr": growth}).reset_index()
+
+
+def trends(table, level="state"):
+    # compute_trends, kept until the table is reloaded
+    key = (table, level)
+    version = data_version(_sources(table, level))
+    with _results_lock:
+        cached = _results.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    df = compute_trends(table, level)
+    with _results_lock:
+        _results[key] = (version, df)
+    return df
+
+
+def yearly(table):
+    # national totals per year with year-on-year growth
+    df = trends(table, "national")
+    measures = summed_columns(TABLES_BY_NAME[table])
+    years = df.groupby("year", as_index=False)[measures].sum()
+    for m in measures:
+        years[f"{m}_yoy"] = years[m] / years[m].shift(1).replace(0, np.nan) - 1
+    return years
+
+
+if __name__ == "__main__":
+    import sys
+    for name in sys.argv[1:] or ["map_transaction"]:
+        for level in LEVELS:
+            result = trends(name, level)
+            print(f"{name} / {level}: {len(result)} rows, {len(result.columns)} columns")
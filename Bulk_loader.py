@@ -0,0 +1,108 @@
+import io
+import time
+
+import pandas as pd
+
+from Dim_state import state_ids
+from Load_manifest import record_loaded
+from Pulse_tables import (TABLES, create_table_sql, csv_columns, index_sql, integer_columns, partition_name,
+                          table_columns)
+from Query_cache import mark_loaded
+from Rollups import ROLLUPS, rollup_name, rollup_sql
+
+# bulk loading of the pulse csv files with PostgreSQL COPY FROM STDIN
+# (one COPY and one transaction per table instead of one INSERT per row)
+
+
+def read_pulse_csv(spec, csv_path=None):
+    # usecols drops the leftover pandas index column (",State,...")
+    columns = csv_columns(spec)
+    df = pd.read_csv(csv_path or spec["csv"], usecols=columns)[columns]
+    df.columns = table_columns(spec)
+    # slugs -> dim_state ids
+    df["state_id"] = state_ids(df["state_id"])
+    # COPY does not round "931663.07" into a BIGINT the way a bound float
+    # parameter does, so round the amounts here
+    for col in integer_columns(spec):
+        df[col] = df[col].round().astype("int64")
+    # one row per natural key, the last occurrence wins like an upsert would;
+    # a duplicate key would otherwise fail the primary key on ATTACH PARTITION
+    duplicates = df.duplicated(spec["primary_key"], keep="last")
+    if duplicates.any():
+        print(f"{spec['table']}: {int(duplicates.sum())} duplicate {'/'.join(spec['primary_key'])} rows collapsed")
+        df = df[~duplicates].reset_index(drop=True)
+    return df
+
+
+def copy_dataframe(cursor, table, df, table_columns=None):
+    # stream the frame through an in-memory csv buffer into COPY FROM STDIN
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    column_list = ""
+    if table_columns:
+        column_list = " (" + ", ".join(table_columns) + ")"
+    cursor.copy_expert(f"COPY {table}{column_list} FROM STDIN WITH (FORMAT csv)", buffer)
+    return len(df)
+
+
+def attach_year(cursor, spec, year, df):
+    # loads one year into a standalone table and swaps it in as the partition:
+    # COPY into an unindexed table, the CHECK constraint lets ATTACH skip its
+    # validation scan and the parent's indexes are built once on attach
+    partition = partition_name(spec, year)
+    staging = f"{partition}_load"
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(f"CREATE TABLE {staging} (LIKE {spec['table']} INCLUDING DEFAULTS)")
+    rows = copy_dataframe(cursor, staging, df, table_columns(spec))
+    cursor.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {staging}_year CHECK (year = {int(year)})")
+
+    cursor.execute("SELECT to_regclass(%s)", (partition,))
+    if cursor.fetchone()[0] is not None:
+        cursor.execute(f"ALTER TABLE {spec['table']} DETACH PARTITION {partition}")
+        cursor.execute(f"DROP TABLE {partition}")
+    cursor.execute(f"ALTER TABLE {staging} RENAME TO {partition}")
+    cursor.execute(f"ALTER TABLE {spec['table']} ATTACH PARTITION {partition} FOR VALUES IN ({int(year)})")
+    return rows
+
+
+def load_table(connection, spec, rebuild=False, digest=None):
+    # one transaction per table: every year of the csv replaces its partition,
+    # so loading the same csv twice leaves the same rows; the csv's sha256 is
+    # recorded in the load manifest in that transaction. rebuild=True is for
+    # schema changes only: the table is dropped and recreated, its rollups
+    # with it, in that same transaction so readers never miss them
+    start = time.perf_counter()
+    df = read_pulse_csv(spec)
+    rows = 0
+    with connection:
+        with connection.cursor() as cursor:
+            if rebuild:
+                # cascades to the rollups, recreated below before the commit
+                cursor.execute(f"DROP TABLE IF EXISTS {spec['table']} CASCADE")
+            cursor.execute(create_table_sql(spec))
+            for statement in index_sql(spec):
+                cursor.execute(statement)
+            for year, year_df in df.groupby("year"):
+                rows += attach_year(cursor, spec, year, year_df)
+            rollups = []
+            if rebuild:
+                for level in ROLLUPS:
+                    for statement in rollup_sql(spec, level):
+                        cursor.execute(statement)
+                    rollups.append(rollup_name(spec["table"], level))
+            if digest is not None:
+                record_loaded(cursor, [(spec["csv"], spec["table"], digest)])
+            mark_loaded(cursor, [spec["table"]] + rollups)
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else float("inf")
+    print(f"{spec['table']}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    return rows, elapsed
+
+
+def load_all(connection, tables=TABLES, rebuild=False):
+    # load every pulse csv one after another, returns {table: (rows, seconds)}
+    stats = {}
+    for spec in tables:
+        stats[spec["table"]] = load_table(connection, spec, rebuild)
+    return stats
@@ -0,0 +1,138 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Pulse_tables import TABLES_BY_NAME
+from Query_cache import data_version
+from Rollups import summed_columns
+from Typed_frames import fact_frame
+
+# in-memory OLAP cube over the breakdown tables (aggregation_user by brand,
+# aggregation_trx by transaction type): state x year x quater x member, built
+# once per data version into dense numpy arrays, one per summed measure. A
+# slice / dice is an index into the arrays and a roll-up a sum over their axes,
+# so the Device Brand and Transaction Type pages answer every selection in
+# well under a millisecond instead of a GROUP BY scan per interaction.
+#   cube(table).slice("year", 2021).dice(quater=[1, 2]).rollup(["brand"])
+
+# dashboard page -> cube table
+CUBE_PAGES = {
+    "Device Brand": "aggregation_user",
+    "Transaction Type": "aggregation_trx",
+}
+
+_cubes = {}
+_cubes_lock = threading.Lock()
+
+
+class Cube:
+
+    def __init__(self, table, dimensions, members, cells, filled):
+        self.table = table
+        self.dimensions = dimensions  # axis order of the arrays
+        self.members = members        # dimension -> labels along its axis
+        self.cells = cells            # measure -> ndarray
+        self.filled = filled          # cells with at least one source row
+        self.measures = list(cells)
+
+    @classmethod
+    def from_frame(cls, table, frame):
+        spec = TABLES_BY_NAME[table]
+        dimensions = ["state", "year", "quater", spec["area"]]
+        members, codes = {}, []
+        for dim in dimensions:
+            column = frame[dim].astype("category").cat.remove_unused_categories()
+            members[dim] = list(column.cat.categories)
+            codes.append(column.cat.codes.to_numpy())
+        shape = tuple(len(members[dim]) for dim in dimensions)
+        flat = np.ravel_multi_index(codes, shape)
+        cells = {}
+        for m in summed_columns(spec):
+            values = np.zeros(int(np.prod(shape)), dtype="int64")
+            np.add.at(values, flat, frame[m].to_numpy(dtype="int64"))
+            cells[m] = values.reshape(shape)
+        filled = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape) > 0
+        return cls(table, dimensions, members, cells, filled)
+
+    def _positions(self, dim, values):
+        if dim not in self.members:
+            raise ValueError(f"{self.table} has no dimension {dim!r}, use one of {self.dimensions}")
+        lookup = {member: i for i, member in enumerate(self.members[dim])}
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        unknown = [v for v in values if v not in lookup]
+        if unknown:
+            raise ValueError(f"unknown {dim} {unknown} in {self.table}")
+        return [lookup[v] for v in values]
+
+    def dice(self, **filters):
+        # sub-cube with every filtered dimension cut to the given member(s)
+        for dim in filters:
+            self._positions(dim, [])  # unknown dimension names fail here
+        index = [self._positions(dim, filters[dim]) if dim in filters else list(range(len(self.members[dim])))
+                 for dim in self.dimensions]
+        selector = np.ix_(*index)
+        members = {dim: [self.members[dim][i] for i in positions] for dim, positions in zip(self.dimensions, index)}
+        return Cube(self.table, self.dimensions, members,
+                    {m: values[selector] for m, values in self.cells.items()}, self.filled[selector])
+
+    def slice(self, dim, value):
+        # sub-cube fixed to one member of a dimension
+        return self.dice(**{dim: value})
+
+    def rollup(self, by=()):
+        # measures summed over every dimension not in `by`, one row per filled
+        # combination, plus each measure's share of the result's total
+        by = list(by)
+        for dim in by:
+            self._positions(dim, [])
+        keep = [self.dimensions.index(dim) for dim in by]
+        dropped = tuple(axis for axis in range(len(self.dimensions)) if axis not in keep)
+        # axes of the sums follow self.dimensions, reorder them to `by`
+        order = np.argsort(np.argsort(keep))
+        filled = self.filled.any(axis=dropped).transpose(order).ravel() if by else np.array([self.filled.any()])
+        # the frame is built once from numpy columns already cut to the filled rows
+        columns = {}
+        if by:
+            grid = np.unravel_index(np.flatnonzero(filled), [len(self.members[dim]) for dim in by])
+            for dim, codes in zip(by, grid):
+                columns[dim] = np.asarray(self.members[dim])[codes]
+        for m, values in self.cells.items():
+            columns[m] = values.sum(axis=dropped).transpose(order).ravel()[filled] if by else np.array([values.sum()])
+        for m in self.measures:
+            total = columns[m].sum()
+            columns[f"{m}_share"] = columns[m] / total if total else np.full(len(columns[m]), np.nan)
+        return pd.DataFrame(columns)
+
+    def periods(self):
+        # (year, quater) pairs with data, for the selectboxes
+        return self.rollup(["year", "quater"])[["year", "quater"]]
+
+
+def cube(table):
+    # the table's cube, rebuilt after the table is reloaded
+    version = data_version([table])
+    with _cubes_lock:
+        cached = _cubes.get(table)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    built = Cube.from_frame(table, fact_frame(table))
+    with _cubes_lock:
+        _cubes[table] = (version, built)
+    return built
+
+
+if __name__ == "__main__":
+    import time
+    for name in CUBE_PAGES.values():
+        start = time.perf_counter()
+        c = cube(name)
+        built = time.perf_counter()
+        member = c.dimensions[-1]
+        c.slice("year", c.members["year"][-1]).rollup([member])
+        c.dice(state=c.members["state"][:5], quater=[1, 2]).rollup(["state", member])
+        c.rollup(["year", "quater"])
+        done = time.perf_counter()
+        shape = "x".join(str(len(c.members[dim])) for dim in c.dimensions)
+        print(f"{name}: cube {shape} built in {(built - start) * 1000:.1f} ms, "
+              f"3 queries in {(done - built) * 1000:.2f} ms")
@@ -1,24 +1,34 @@
-import psycopg2 
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.express as px
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
-# make a connection to the db
-connection = psycopg2.connect(
-                        host = "localhost",
-                        port = "5432",
-                        user = "postgres",
-                        database = "phonepe_pulse_db",
-                        password = "jegan"
-                        )
-
-cursor = connection.cursor()
+import Profiler
+
+# pooled db access, shared across reruns and sessions (see Query_layer.py),
+# each analysis page fetches its data in two queries (see Page_queries.py)
+from Page_queries import PAGES, load_page, load_periods, load_top_bottom, load_top_states, period_options
+from Query_layer import submit
+from Geo_data import india_states
+from Prefetch import prefetch_quarters
+from Figure_cache import cached_figure
+from Rollups import rollup_name
+from Analytics import cagr, period_label, trends, yearly
+from Cube import CUBE_PAGES, cube
+from Drilldown import load_districts, load_states
+from Dim_state import STATES
+from Export import EXPORT_FORMATS, EXPORT_MAX_ROWS, export_file_name, export_rows, export_spooled
+
+# opt-in timing of the hot path (see Profiler.py): figure building and chart
+# rendering are timed through these proxies, db calls in Query_layer.py
+px = Profiler.timed_module(px, "figure")
+st = Profiler.timed_module(st, "render", {"plotly_chart", "table"})
 
 # Streamlit App Title -- Introduction
 page = st.sidebar.selectbox("Choose a page", ["Introduction", "Data Analysis"])
+profile = st.sidebar.checkbox("Profile page renders", value=Profiler.ENABLED)
+Profiler.start_run(page, enabled=profile)
 
 if page == "Introduction":
 
@@ -45,21 +55,80 @@ if page == "Introduction":
         """, unsafe_allow_html=True)
 
 # Data Analysis - Business Case Study
+# (state and quarter summaries come from the rollups built by Rollups.py,
+# each page is fetched in two queries by Page_queries.py)
 elif page == "Data Analysis":
 
     st.markdown("<h3>For the further inspection, we can click the following buttons </h3>",  unsafe_allow_html=True)
     data = st.selectbox("Click anyone below :", ["User Engagement and Growth Strategy", "Insurance Engagement Analysis", 
                                                  "Transaction Analysis Across States and Districts", "User Registration Analysis", 
-                                                 "Insurance Transactions Analysis"])
+                                                 "Insurance Transactions Analysis", *CUBE_PAGES])
+    Profiler.set_page(data)
+    # figures are cached per view and data version (see Figure_cache.py)
+    tables = [PAGES[data]["table"] if data in PAGES else CUBE_PAGES[data]]
+    # the state level charts read the table's rollup and dim_state, their
+    # figures are keyed on those (the rollup is refreshed after the table load)
+    figure_tables = [rollup_name(tables[0], "by_state"), "dim_state"]
+
+    def district_drilldown(table, year, quarter, measure, scale):
+        # state level first (~36 rows), the districts of a state are fetched
+        # only when the user drills into it (see Drilldown.py)
+        df_states = load_states(table, year, quarter)
+        selected_state = st.selectbox("Drill down into a state:", df_states["state"].tolist(), index=None,
+                                      placeholder="All states", key=f"drilldown_{table}")
+        if selected_state is None:
+            df_tree, path = df_states, ["state"]
+        else:
+            state_id = df_states.loc[df_states["state"] == selected_state, "state_id"].iloc[0]
+            df_tree = load_districts(table, state_id, year, quarter).assign(state=selected_state)
+            path = ["state", "transaction_area"]
+
+        def build_treemap():
+            return px.treemap(
+                df_tree,
+                path=path,
+                values=measure,
+                color=measure,
+                color_continuous_scale=scale,
+                title=f"Treemap: {selected_state or 'State'} → District by {measure.replace('_', ' ').title()} - {year} Q{quarter}"
+            )
+
+        drilled = [table] if selected_state is not None else []
+        fig_tree = cached_figure(data, f"treemap {table} {selected_state}", year, quarter,
+                                 [rollup_name(table, "by_state"), "dim_state"] + drilled, build_treemap)
+        st.plotly_chart(fig_tree, use_container_width=True)
 
-    if data == "User Engagement and Growth Strategy" :
-        # Fetch unique years
-        cursor.execute("SELECT DISTINCT year FROM map_transaction ORDER BY year;")
-        years = [row[0] for row in cursor.fetchall()]
+    def export_section(table, year, quarter):
+        # raw rows of the selected quarter as csv / parquet, streamed from a
+        # server-side cursor when the button is clicked (see Export.py)
+        with st.expander("⬇️ Export the rows behind this page"):
+            col1, col2 = st.columns(2)
+            with col1:
+                states = {name: state_id for state_id, _, name, _ in STATES}
+                export_state = st.selectbox("State:", ["All states"] + list(states), key="export_state")
+            with col2:
+                fmt = st.radio("Format:", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+            state_id = states.get(export_state)
+            state = export_state if state_id is not None else None
+            rows = export_rows(table, year, quarter, state_id)
+            if rows > EXPORT_MAX_ROWS:
+                # the download would be held in memory whole, see Export.py
+                st.warning(f"{rows:,} rows is over the {EXPORT_MAX_ROWS:,} row download limit, "
+                           f"export it with `python Export.py {table} {year} {quarter} {fmt}`")
+                return
+            st.download_button(
+                f"Download {table} {year} Q{quarter} ({fmt})",
+                # called on a separate thread when clicked, the page does not wait for it
+                data=lambda: export_spooled(table, year, quarter, state_id, fmt),
+                file_name=export_file_name(table, year, quarter, state, fmt),
+                mime=EXPORT_FORMATS[fmt][1],
+                on_click="ignore",
+            )
 
-        # Fetch unique quarters
-        cursor.execute("SELECT DISTINCT quater FROM map_transaction ORDER BY quater;")
-        quarters = [row[0] for row in cursor.fetchall()]
+    if data == "User Engagement and Growth Strategy" :
+        # Fetch unique years and quarters
+        periods = load_periods(data)
+        years, quarters = period_options(periods)
 
         # Streamlit dropdowns
         selected_year = st.selectbox("Select Year:", years)
@@ -67,57 +136,41 @@ elif page == "Data Analysis":
 
         #================Query part-----------------
 
-        query = """ SELECT SUM (transaction_amount), SUM (transaction_count) FROM map_transaction WHERE year = %s AND quater =%s;"""
+        # totals, state and district level of the quarter in one query
+        page_data = load_page(data, selected_year, selected_quarter)
+        # warm the cache for the neighbouring quarters in the background (see Prefetch.py)
+        prefetch_quarters(periods, selected_year, selected_quarter, load_page, data)
 
-        cursor.execute(query,(selected_year,selected_quarter))
-        result = cursor.fetchone()
-
-        total_amount = result[0] if result[0] is not None else 0
-        total_count = result[1] if result[1] is not None else 0
+        total_amount = page_data["totals"]["transaction_amount"]
+        total_count = page_data["totals"]["transaction_count"]
 
         st.markdown(f"<h3>Total Transaction Amount: ₹{total_amount:,.2f}</h3>", unsafe_allow_html=True)
         st.markdown(f"<h3>Total Transaction Count: {total_count:,}</h3>", unsafe_allow_html=True)
 
     # --- Get State-wise Transaction Amount ---
-        cursor.execute("""
-        SELECT state, SUM(transaction_amount) as total_amount
-        FROM map_transaction
-        WHERE year = %s AND quater = %s
-        GROUP BY state
-        ORDER BY state;
-        """, (selected_year, selected_quarter))
-
-        data_rows = cursor.fetchall()
-        df_map = pd.DataFrame(data_rows, columns=['state', 'transaction_amount'])
-
-        state_name_map = {
-        'andaman-&-nicobar-islands': 'Andaman & Nicobar Island','andhra-pradesh' : 'Andhra Pradesh','arunachal-pradesh' : 'Arunachal Pradesh',
-        'assam': 'Assam', 'bihar' : 'Bihar', 'chandigarh' : 'Chandigarh', 'chhattisgarh' : 'Chhattisgarh', 
-        'dadra-&-nagar-haveli-&-daman-&-diu': 'Dadra and Nagar Haveli', 'delhi': 'Delhi', 'goa' : 'Goa', 'gujarat' : 'Gujarat',
-        'haryana' : 'Haryana', 'himachal-pradesh' : 'Himachal Pradesh', 'jammu-&-kashmir' : 'Jammu & Kashmir', 'jharkhand' : 'Jharkhand',
-        'karnataka' : 'Karnataka', 'kerala' : 'Kerala', 'ladakh' : 'Ladakh', 'lakshadweep' : 'Lakshadweep', 'madhya-pradesh' : 'Madhya Pradesh',
-        'maharashtra' : 'Maharashtra', 'manipur' : 'Manipur', 'meghalaya' : 'Meghalaya', 'mizoram' : 'Mizoram', 'nagaland' : 'Nagaland',
-        'odisha': 'Odisha', 'puducherry': 'Puducherry', 'punjab' : 'Punjab', 'rajasthan' : 'Rajasthan', 'sikkim' : 'Sikkim', 
-        'tamil-nadu' : 'Tamil Nadu', 'telangana' : 'Telangana', 'tripura' : 'Tripura', 'uttar-pradesh' : 'Uttar Pradesh',
-        'uttarakhand' : 'Uttarakhand', 'west-bengal' : 'West Bengal'
-        }
-
-        df_map['state'] = df_map['state'].replace(state_name_map)
-        # India GeoJSON for state boundaries
-        geojson_url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+        # display names and GeoJSON keys come from dim_state (see Dim_state.py)
+        df_map = page_data["states"][['state', 'geo_key', 'transaction_amount']].copy()
 
-        # Choropleth Map
-        fig = px.choropleth(
-            df_map,
-            geojson=geojson_url,
-            featureidkey='properties.ST_NM',
-            locations='state',
-            color='transaction_amount',
-            color_continuous_scale='Purples',
-            title=f"State-wise Transaction Amount - {selected_year} Q{selected_quarter}"
-        )
+        # India GeoJSON for state boundaries (local, simplified, see Geo_data.py)
+        india_geojson = india_states()
 
-        fig.update_geos(fitbounds="locations", visible=False)
+        # Choropleth Map
+        def build_map():
+            fig = px.choropleth(
+                df_map,
+                geojson=india_geojson,
+                featureidkey='properties.ST_NM',
+                locations='geo_key',
+                hover_name='state',
+                color='transaction_amount',
+                color_continuous_scale='Purples',
+                title=f"State-wise Transaction Amount - {selected_year} Q{selected_quarter}"
+            )
+
+            fig.update_geos(fitbounds="locations", visible=False)
+            return fig
+
+        fig = cached_figure(data, "map", selected_year, selected_quarter, figure_tables, build_map)
         st.plotly_chart(fig, use_container_width=True)
 
         # Bar Chart - State-wise Transaction Amount
@@ -142,58 +195,64 @@ elif page == "Data Analysis":
 
         st.subheader("📦 Box Plot: Transaction Amount Distribution by State")
 
-        fig_box = px.box(
-            df_map,
-            x="state",
-            y="transaction_amount",
-            points="all",  # Show all points including outliers
-            color="state",
-            title=f"Distribution of Transaction Amounts by State - {selected_year} Q{selected_quarter}"
-        )
+        def build_box():
+            fig_box = px.box(
+                df_map,
+                x="state",
+                y="transaction_amount",
+                points="all",  # Show all points including outliers
+                color="state",
+                title=f"Distribution of Transaction Amounts by State - {selected_year} Q{selected_quarter}"
+            )
+
+            fig_box.update_layout(xaxis_tickangle=-45, showlegend=False)
+            return fig_box
 
-        fig_box.update_layout(xaxis_tickangle=-45, showlegend=False)
+        fig_box = cached_figure(data, "box", selected_year, selected_quarter, figure_tables, build_box)
         st.plotly_chart(fig_box, use_container_width=True)
 
         st.subheader("🧭 Treemap: State → District by Transaction Amount")
 
-        # Fetch state and district-level data
-        cursor.execute("""
-            SELECT state, transaction_area, SUM(transaction_amount) as transaction_amount
-            FROM map_transaction
-            WHERE year = %s AND quater = %s
-            GROUP BY state, transaction_area;
-        """, (selected_year, selected_quarter))
-
-        district_data = cursor.fetchall()
-        df_districts = pd.DataFrame(district_data, columns=['state', 'transaction_area', 'transaction_amount'])
-
-        # Replace state names
-        df_districts['state'] = df_districts['state'].replace(state_name_map)
-
-        # Treemap
-        fig_tree = px.treemap(
-            df_districts,
-            path=['state', 'transaction_area'],
-            values='transaction_amount',
-            title=f"Treemap: State → District by Transaction Amount - {selected_year} Q{selected_quarter}",
-            color='transaction_amount',
-            color_continuous_scale='Purples'
-        )
+        district_drilldown(tables[0], selected_year, selected_quarter, "transaction_amount", "Purples")
 
-        st.plotly_chart(fig_tree, use_container_width=True)
+        st.subheader("🚀 Growth: Year-on-Year Change in Transaction Amount by State")
+
+        # growth and rank movement of every state, computed once per data load (see Analytics.py)
+        df_growth = trends(tables[0], "state")
+        df_growth = df_growth[(df_growth["year"] == selected_year) & (df_growth["quater"] == selected_quarter)]
+
+        def build_growth():
+            fig_growth = px.bar(
+                df_growth.dropna(subset=["transaction_amount_yoy"]).sort_values(by="transaction_amount_yoy", ascending=False),
+                x="state",
+                y="transaction_amount_yoy",
+                color="transaction_amount_yoy",
+                color_continuous_scale="Purples",
+                hover_data={"transaction_amount_qoq": ":.1%", "transaction_amount_rank": True,
+                            "transaction_amount_rank_change": True},
+                labels={"transaction_amount_yoy": "YoY Growth", "transaction_amount_qoq": "QoQ Growth",
+                        "transaction_amount_rank": "Rank", "transaction_amount_rank_change": "Places Gained"},
+                title=f"Year-on-Year Growth of Transaction Amount - {selected_year} Q{selected_quarter}"
+            )
+
+            fig_growth.update_layout(xaxis_title="State", yaxis_tickformat=".0%", xaxis_tickangle=-45)
+            return fig_growth
+
+        fig_growth = cached_figure(data, "growth", selected_year, selected_quarter, figure_tables, build_growth)
+        st.plotly_chart(fig_growth, use_container_width=True)
 
 
 
     #============= Insurance Engagement Analysis ===============
 
     elif data == "Insurance Engagement Analysis" :
-        # fetch unique years
-        cursor.execute("SELECT DISTINCT year FROM map_users ORDER BY year;")
-        year = [row[0] for row in cursor.fetchall()]
+        # the all-time queries do not depend on the selection, they run on the
+        # query pool while the page renders (see Query_layer.submit)
+        top_bottom_future = submit(load_top_bottom, data, "registered_users", 10)
 
-        # fetch unique quarters
-        cursor.execute("SELECT DISTINCT quater FROM map_users ORDER BY quater;")
-        quarter = [row[0] for row in cursor.fetchall()]
+        # fetch unique years and quarters
+        periods = load_periods(data)
+        year, quarter = period_options(periods)
 
         # streamlit applications
         col1,col2 = st.columns(2)
@@ -204,12 +263,13 @@ elif page == "Data Analysis":
 
         #------------ Query Part --------------
 
-        query = """SELECT SUM (registered_users), SUM (app_opens) FROM map_users WHERE year = %s AND quater = %s;"""
-        cursor.execute(query,(selected_year,selected_quarter))
-        result = cursor.fetchone()
+        # totals, state level and all-time state sums in one query
+        page_data = load_page(data, selected_year, selected_quarter)
+        # warm the cache for the neighbouring quarters in the background (see Prefetch.py)
+        prefetch_quarters(periods, selected_year, selected_quarter, load_page, data)
 
-        total_users = result[0] if result[0] is not None else 0 
-        total_apps = result[1] if result[1] is not None else 0
+        total_users = page_data["totals"]["registered_users"]
+        total_apps = page_data["totals"]["app_opens"]
 
         st.markdown(f"### Total Registered Users : {total_users}",unsafe_allow_html = True)
         st.markdown(f"### Total App Opens : {total_apps}", unsafe_allow_html=True)
@@ -217,59 +277,35 @@ elif page == "Data Analysis":
 
         # =========== Display in the Indian Map
 
-        cursor.execute("""
-        SELECT state, SUM(registered_users) as total_users
-        FROM map_users
-        WHERE year = %s AND quater = %s
-        GROUP BY state
-        ORDER BY state;
-        """, (selected_year, selected_quarter))
-
-        data_rows = cursor.fetchall()
-        df_map = pd.DataFrame(data_rows, columns=['state', 'registered_users'])
-
-        state_name_map = {
-        'andaman-&-nicobar-islands': 'Andaman & Nicobar Island','andhra-pradesh' : 'Andhra Pradesh','arunachal-pradesh' : 'Arunachal Pradesh',
-        'assam': 'Assam', 'bihar' : 'Bihar', 'chandigarh' : 'Chandigarh', 'chhattisgarh' : 'Chhattisgarh', 
-        'dadra-&-nagar-haveli-&-daman-&-diu': 'Dadra and Nagar Haveli', 'delhi': 'Delhi', 'goa' : 'Goa', 'gujarat' : 'Gujarat',
-        'haryana' : 'Haryana', 'himachal-pradesh' : 'Himachal Pradesh', 'jammu-&-kashmir' : 'Jammu & Kashmir', 'jharkhand' : 'Jharkhand',
-        'karnataka' : 'Karnataka', 'kerala' : 'Kerala', 'ladakh' : 'Ladakh', 'lakshadweep' : 'Lakshadweep', 'madhya-pradesh' : 'Madhya Pradesh',
-        'maharashtra' : 'Maharashtra', 'manipur' : 'Manipur', 'meghalaya' : 'Meghalaya', 'mizoram' : 'Mizoram', 'nagaland' : 'Nagaland',
-        'odisha': 'Odisha', 'puducherry': 'Puducherry', 'punjab' : 'Punjab', 'rajasthan' : 'Rajasthan', 'sikkim' : 'Sikkim', 
-        'tamil-nadu' : 'Tamil Nadu', 'telangana' : 'Telangana', 'tripura' : 'Tripura', 'uttar-pradesh' : 'Uttar Pradesh',
-        'uttarakhand' : 'Uttarakhand', 'west-bengal' : 'West Bengal'
-        }
-
-        df_map['state'] = df_map['state'].replace(state_name_map)
-
-
-        geojson_url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
-        fig = px.choropleth(
-            df_map,
-            geojson = geojson_url,
-            featureidkey='properties.ST_NM',
-            locations='state',
-            color='registered_users',
-            color_continuous_scale='Brown'
-        )
+        df_map = page_data["states"][['state', 'geo_key', 'registered_users']].copy()
 
-        fig.update_geos(fitbounds="locations", visible=False)
+        india_geojson = india_states()
+        def build_map():
+            fig = px.choropleth(
+                df_map,
+                geojson=india_geojson,
+                featureidkey='properties.ST_NM',
+                locations='geo_key',
+                hover_name='state',
+                color='registered_users',
+                color_continuous_scale='Brwnyl'
+            )
 
+            fig.update_geos(fitbounds="locations", visible=False)
+            return fig
+
+        fig = cached_figure(data, "map", selected_year, selected_quarter, figure_tables, build_map)
         st.plotly_chart(fig, use_container_width=True)
 
+        st.subheader("🧭 Treemap: State → District by Registered Users")
+        district_drilldown(tables[0], selected_year, selected_quarter, "registered_users", "Brwnyl")
+
         # ----------   Top 10 states with Registered Users -- 
-        query_pie = """
-            SELECT state, SUM(registered_users) AS total_users
-            FROM map_users
-            GROUP BY state
-            ORDER BY total_users DESC
-            LIMIT 10;
-        """
-        cursor.execute(query_pie)
-        rows = cursor.fetchall()
-
-        # Convert to DataFrame
-        df_users = pd.DataFrame(rows, columns=["State", "Registered Users"])
+        # top / bottom 10 of the all-time state sums, ordered and limited in sql
+        columns = {"state": "State", "registered_users": "Registered Users"}
+        df_top, df_bottom = (df.rename(columns=columns)[["State", "Registered Users"]]
+                             for df in top_bottom_future.result())
+        df_users = df_top
 
         # Donut chart 
         fig = px.pie(
@@ -285,16 +321,8 @@ elif page == "Data Analysis":
         st.plotly_chart(fig)
 
 # ======= Apps opens as Null States =========
-        query_apps = """
-            SELECT state, SUM(registered_users) AS registered_users, SUM(app_opens) AS app_opens
-            FROM map_users
-            GROUP BY state ORDER BY state ASC LIMIT 15;
-        """
-        cursor.execute(query_apps)
-        rows = cursor.fetchall()
-
-        # Load into DataFrame
-        df_apps = pd.DataFrame(rows, columns=["state", "registered_users", "app_opens"])
+        # first 15 states (alphabetical) of the all-time sums
+        df_apps = page_data["all_time"].head(15).copy()
 
         # Add status column for coloring
         df_apps["status"] = df_apps["app_opens"].apply(lambda x: "Inactive" if x == 0 else "Active")
@@ -316,29 +344,7 @@ elif page == "Data Analysis":
         st.plotly_chart(fig)
 
         #======= Top and Bottom states ==
-        
-        query_top = """
-            SELECT state, SUM(registered_users) AS total_users
-            FROM map_users
-            GROUP BY state
-            ORDER BY total_users DESC
-            LIMIT 10;
-        """
-        cursor.execute(query_top)
-        rows_top = cursor.fetchall()
-        df_top = pd.DataFrame(rows_top, columns=["State", "Registered Users"])
-
-        # Query: Bottom 10 states by insurance registered users
-        query_bottom = """
-            SELECT state, SUM(registered_users) AS total_users
-            FROM map_users
-            GROUP BY state
-            ORDER BY total_users ASC
-            LIMIT 10;
-        """
-        cursor.execute(query_bottom)
-        rows_bottom = cursor.fetchall()
-        df_bottom = pd.DataFrame(rows_bottom, columns=["State", "Registered Users"])
+        # (df_top / df_bottom come from the same all-time frame as the donut chart)
 
         # Top 10 bar chart
         st.subheader("🔝 Top 10 States by Insurance Registered Users")
@@ -369,13 +375,14 @@ elif page == "Data Analysis":
 # ==================  Transaction Analysis Across States and Districts =========
 
     elif data == "Transaction Analysis Across States and Districts" :
-        # fetch unique years
-        cursor.execute("SELECT DISTINCT year FROM top_transaction ORDER BY year;")
-        year = [row[0] for row in cursor.fetchall()]
+        # the all-time queries do not depend on the selection, they run on the
+        # query pool while the page renders (see Query_layer.submit)
+        count_future = submit(load_top_states, data, "transaction_count", 12, bottom=True)
+        top_bottom_future = submit(load_top_bottom, data, "transaction_amount", 5)
 
-        # fetch unique quarters
-        cursor.execute("SELECT DISTINCT quater FROM top_transaction ORDER BY quater;")
-        quarter = [row[0] for row in cursor.fetchall()]
+        # fetch unique years and quarters
+        periods = load_periods(data)
+        year, quarter = period_options(periods)
 
         # streamlit applications
         col1,col2 = st.columns(2)
@@ -386,76 +393,51 @@ elif page == "Data Analysis":
 
         #------------ Query Part --------------
 
-        query = """SELECT SUM (transaction_amount), SUM (transaction_count) FROM top_transaction WHERE year = %s AND quater = %s;"""
-        cursor.execute(query,(selected_year,selected_quarter))
-        result = cursor.fetchone()
+        # totals, state level and all-time state sums in one query
+        page_data = load_page(data, selected_year, selected_quarter)
+        # warm the cache for the neighbouring quarters in the background (see Prefetch.py)
+        prefetch_quarters(periods, selected_year, selected_quarter, load_page, data)
 
-        total_amount = result[0] if result[0] is not None else 0 
-        total_count = result[1] if result[1] is not None else 0
+        total_amount = page_data["totals"]["transaction_amount"]
+        total_count = page_data["totals"]["transaction_count"]
 
         st.markdown(f"### Total Transaction Amount : {total_amount}",unsafe_allow_html = True)
         st.markdown(f"### Total Transaction Count : {total_count}", unsafe_allow_html=True)
         
         # --- Get State-wise Transaction Amount ---
-        cursor.execute("""
-        SELECT state, SUM(transaction_amount) as total_amount,
-        SUM(transaction_count) as total_count
-        FROM top_transaction
-        WHERE year = %s AND quater = %s
-        GROUP BY state
-        ORDER BY state;
-        """, (selected_year, selected_quarter))
-
-        data_rows = cursor.fetchall()
-        df_map = pd.DataFrame(data_rows, columns=['state', 'transaction_amount','transaction_count'])
-        df_map['transaction_amount'] = pd.to_numeric(df_map['transaction_amount'], errors='coerce')
-
-        state_name_map = {
-        'andaman-&-nicobar-islands': 'Andaman & Nicobar Island','andhra-pradesh' : 'Andhra Pradesh','arunachal-pradesh' : 'Arunachal Pradesh',
-        'assam': 'Assam', 'bihar' : 'Bihar', 'chandigarh' : 'Chandigarh', 'chhattisgarh' : 'Chhattisgarh',
-        'dadra-&-nagar-haveli-&-daman-&-diu': 'Dadra and Nagar Haveli', 'delhi': 'Delhi', 'goa' : 'Goa', 'gujarat' : 'Gujarat',
-        'haryana' : 'Haryana', 'himachal-pradesh' : 'Himachal Pradesh', 'jammu-&-kashmir' : 'Jammu & Kashmir', 'jharkhand' : 'Jharkhand',
-        'karnataka' : 'Karnataka', 'kerala' : 'Kerala', 'ladakh' : 'Ladakh', 'lakshadweep' : 'Lakshadweep', 'madhya-pradesh' : 'Madhya Pradesh',
-        'maharashtra' : 'Maharashtra', 'manipur' : 'Manipur', 'meghalaya' : 'Meghalaya', 'mizoram' : 'Mizoram', 'nagaland' : 'Nagaland',
-        'odisha': 'Odisha', 'puducherry': 'Puducherry', 'punjab' : 'Punjab', 'rajasthan' : 'Rajasthan', 'sikkim' : 'Sikkim',
-        'tamil-nadu' : 'Tamil Nadu', 'telangana' : 'Telangana', 'tripura' : 'Tripura', 'uttar-pradesh' : 'Uttar Pradesh',
-        'uttarakhand' : 'Uttarakhand', 'west-bengal' : 'West Bengal'
-        }
-
-        df_map['state'] = df_map['state'].replace(state_name_map)
-        # India GeoJSON for state boundaries
-        geojson_url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+        df_map = page_data["states"][['state', 'geo_key', 'transaction_amount', 'transaction_count']].copy()
 
-        # Choropleth Map
-        fig = px.choropleth(
-            df_map,
-            geojson=geojson_url,
-            featureidkey='properties.ST_NM',
-            locations='state',
-            color='transaction_amount',
-            hover_name='state',  
-            hover_data={
-                'transaction_amount': True,
-                'transaction_count': True
-            },
-            color_continuous_scale='Reds',
-            title=f"State-wise Transaction Amount - {selected_year} Q{selected_quarter}"
-        )
+        # India GeoJSON for state boundaries (local, simplified, see Geo_data.py)
+        india_geojson = india_states()
 
-        fig.update_geos(fitbounds="locations", visible=False)
+        # Choropleth Map
+        def build_map():
+            fig = px.choropleth(
+                df_map,
+                geojson=india_geojson,
+                featureidkey='properties.ST_NM',
+                locations='geo_key',
+                color='transaction_amount',
+                hover_name='state',  
+                hover_data={
+                    'transaction_amount': True,
+                    'transaction_count': True
+                },
+                color_continuous_scale='Reds',
+                title=f"State-wise Transaction Amount - {selected_year} Q{selected_quarter}"
+            )
+
+            fig.update_geos(fitbounds="locations", visible=False)
+            return fig
+
+        fig = cached_figure(data, "map", selected_year, selected_quarter, figure_tables, build_map)
         st.plotly_chart(fig, use_container_width=True)
 
         # Bar Chart - State-wise Transaction Amount
         st.subheader("📊 Bar Chart: States to be marketed to increase the Transaction Amount")
 
-        query_states = """ SELECT state, SUM(transaction_count) as total_count FROM top_transaction GROUP BY state
-                           ORDER BY total_count ASC LIMIT 12;"""
-        
-        cursor.execute(query_states)
-        rows = cursor.fetchall()
-
-        # Convert to DataFrame
-        df_count = pd.DataFrame(rows, columns=["state", "transaction_count"])
+        # 12 states with the lowest all-time transaction count
+        df_count = count_future.result()[["state", "transaction_count"]]
         bar_fig = px.bar(
             df_count.sort_values(by='transaction_count', ascending=False),
             x='state',
@@ -474,21 +456,8 @@ elif page == "Data Analysis":
 
                 # Get top 5 and bottom 5 states by transaction amount
 
-        query_rel = """
-            SELECT state, SUM(transaction_amount) AS transaction_amount
-            FROM top_transaction
-            GROUP BY state;
-        """
-        cursor.execute(query_rel)
-        rows = cursor.fetchall()
-
-        # --- Create DataFrame ---
-        df_txn = pd.DataFrame(rows, columns=["state", "transaction_amount"])
-        df_txn["transaction_amount"] = pd.to_numeric(df_txn["transaction_amount"], errors="coerce")
-
-        df_sorted = df_txn.sort_values(by="transaction_amount", ascending=False)
-        top_5 = df_sorted.head(5)
-        bottom_5 = df_sorted.tail(5)
+        top_5, bottom_5 = top_bottom_future.result()
+        bottom_5 = bottom_5.iloc[::-1]
 
         #  Scatter plot for Top 5
         st.subheader("📈 Top 5 States by Transaction Amount")
@@ -522,13 +491,11 @@ elif page == "Data Analysis":
         #===========  User Registration Analysis ==================
 
     elif data == "User Registration Analysis" :
-        # fetch unique years
-        cursor.execute("SELECT DISTINCT year FROM top_user ORDER BY year;")
-        year = [row[0] for row in cursor.fetchall()]
+        # year x quarter totals, also used by the trend line chart below
+        periods = load_periods(data)
 
-        # fetch unique quarters
-        cursor.execute("SELECT DISTINCT quater FROM top_user ORDER BY quater;")
-        quarter = [row[0] for row in cursor.fetchall()]
+        # fetch unique years and quarters
+        year, quarter = period_options(periods)
 
         # streamlit applications
         col1,col2 = st.columns(2)
@@ -539,70 +506,50 @@ elif page == "Data Analysis":
 
         #------------ Query Part --------------
 
-        query_user = """SELECT SUM (registered_users) FROM top_user WHERE year = %s AND quater = %s;"""
-        cursor.execute(query_user,(selected_year,selected_quarter))
-        result = cursor.fetchone()
+        # the top 15 bar query runs on the query pool next to the page query
+        top_states_future = submit(load_top_states, data, "registered_users", 15, selected_year, selected_quarter,
+                                   other=True)
+
+        # totals and state level in one query
+        page_data = load_page(data, selected_year, selected_quarter)
+        # warm the cache for the neighbouring quarters in the background (see Prefetch.py)
+        prefetch_quarters(periods, selected_year, selected_quarter, load_page, data)
 
-        total_user = result[0] if result[0] is not None else 0 
+        total_user = page_data["totals"]["registered_users"]
         
         st.markdown(f"### Total Registered Users : {total_user}",unsafe_allow_html = True)
         
         # --- Get State-wise Registered Users ---
-        cursor.execute("""
-        SELECT state, SUM(registered_users) as total_users
-        FROM top_user
-        WHERE year = %s AND quater = %s
-        GROUP BY state
-        ORDER BY state;
-        """, (selected_year, selected_quarter))
-
-        data_rows = cursor.fetchall()
-        df_map = pd.DataFrame(data_rows, columns=['state', 'registered_users'])
-        df_map['registered_users'] = pd.to_numeric(df_map['registered_users'], errors='coerce')
-
-        state_name_map = {
-        'andaman-&-nicobar-islands': 'Andaman & Nicobar Island','andhra-pradesh' : 'Andhra Pradesh','arunachal-pradesh' : 'Arunachal Pradesh',
-        'assam': 'Assam', 'bihar' : 'Bihar', 'chandigarh' : 'Chandigarh', 'chhattisgarh' : 'Chhattisgarh',
-        'dadra-&-nagar-haveli-&-daman-&-diu': 'Dadra and Nagar Haveli', 'delhi': 'Delhi', 'goa' : 'Goa', 'gujarat' : 'Gujarat',
-        'haryana' : 'Haryana', 'himachal-pradesh' : 'Himachal Pradesh', 'jammu-&-kashmir' : 'Jammu & Kashmir', 'jharkhand' : 'Jharkhand',
-        'karnataka' : 'Karnataka', 'kerala' : 'Kerala', 'ladakh' : 'Ladakh', 'lakshadweep' : 'Lakshadweep', 'madhya-pradesh' : 'Madhya Pradesh',
-        'maharashtra' : 'Maharashtra', 'manipur' : 'Manipur', 'meghalaya' : 'Meghalaya', 'mizoram' : 'Mizoram', 'nagaland' : 'Nagaland',
-        'odisha': 'Odisha', 'puducherry': 'Puducherry', 'punjab' : 'Punjab', 'rajasthan' : 'Rajasthan', 'sikkim' : 'Sikkim',
-        'tamil-nadu' : 'Tamil Nadu', 'telangana' : 'Telangana', 'tripura' : 'Tripura', 'uttar-pradesh' : 'Uttar Pradesh',
-        'uttarakhand' : 'Uttarakhand', 'west-bengal' : 'West Bengal'
-        }
-
-        df_map['state'] = df_map['state'].replace(state_name_map)
-        # India GeoJSON for state boundaries
-        geojson_url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+        df_map = page_data["states"][['state', 'geo_key', 'registered_users']].copy()
 
-        # Choropleth Map
-        fig = px.choropleth(
-            df_map,
-            geojson=geojson_url,
-            featureidkey='properties.ST_NM',
-            locations='state',
-            color='registered_users',
-            color_continuous_scale = 'Greens',
-            title=f"State-wise Registerted Users - {selected_year} Q{selected_quarter}"
-        )
+        # India GeoJSON for state boundaries (local, simplified, see Geo_data.py)
+        india_geojson = india_states()
 
-        fig.update_geos(fitbounds="locations", visible=False)
+        # Choropleth Map
+        def build_map():
+            fig = px.choropleth(
+                df_map,
+                geojson=india_geojson,
+                featureidkey='properties.ST_NM',
+                locations='geo_key',
+                hover_name='state',
+                color='registered_users',
+                color_continuous_scale = 'Greens',
+                title=f"State-wise Registerted Users - {selected_year} Q{selected_quarter}"
+            )
+
+            fig.update_geos(fitbounds="locations", visible=False)
+            return fig
+
+        fig = cached_figure(data, "map", selected_year, selected_quarter, figure_tables, build_map)
         st.plotly_chart(fig, use_container_width=True)
 
         # --------------- most users registered during a specific year-quarter combination ----------
 
-        query_com = f"""
-            SELECT state, SUM(registered_users) AS registered_users
-            FROM top_user
-            WHERE year = {selected_year} AND quater = {selected_quarter}
-            GROUP BY state
-            ORDER BY registered_users DESC;
-        """
-        cursor.execute(query_com)
-        rows = cursor.fetchall()
-
-        df = pd.DataFrame(rows, columns=["state", "registered_users"])
+        # top 15 states of the quarter, highest first, the rest summed into "Other"
+        df = top_states_future.result()
+        prefetch_quarters(periods, selected_year, selected_quarter, load_top_states, data, "registered_users", 15,
+                          other=True)
 
         # Horizontal bar chart
         fig = px.bar(
@@ -620,33 +567,19 @@ elif page == "Data Analysis":
 
         # ===================  All data in single plot line chart ===============
 
-        # Query all year, quarter and registered_users
-        query_all = """
-            SELECT year, quater, SUM(registered_users) as total_users
-            FROM top_user
-            GROUP BY year, quater
-            ORDER BY year, quater;
-        """
-        cursor.execute(query_all)
-        rows = cursor.fetchall()
-
-        # Convert to DataFrame
-        df = pd.DataFrame(rows, columns=["year", "quater", "total_users"])
-
-        # Create a combined column for year-quarter
-        df["year_quarter"] = df["year"].astype(str) + " Q" + df["quater"].astype(str)
-
-        # Sort by year and quarter again for proper line continuity
-        df = df.sort_values(by=["year", "quater"])
+        # national registered users per quarter with QoQ / YoY growth (see Analytics.py)
+        df = trends(tables[0], "national")
 
         # Plot the line chart
         fig = px.line(
             df,
-            x="year_quarter",
-            y="total_users",
+            x="period_label",
+            y="registered_users",
             markers=True,
+            hover_data={"registered_users_qoq": ":.1%", "registered_users_yoy": ":.1%"},
             title="📈 Registered Users Trend Over All Year-Quarter",
-            labels={"year_quarter": "Year - Quarter", "total_users": "Registered Users"},
+            labels={"period_label": "Year - Quarter", "registered_users": "Registered Users",
+                    "registered_users_qoq": "QoQ Growth", "registered_users_yoy": "YoY Growth"},
         )
 
         # Show in Streamlit
@@ -656,13 +589,15 @@ elif page == "Data Analysis":
 
     # --------------------------   Insurance Transactions Analysis  ------------------
     elif data == "Insurance Transactions Analysis" :
-        # fetch unique years
-        cursor.execute("SELECT DISTINCT year FROM top_insurance ORDER BY year;")
-        year = [row[0] for row in cursor.fetchall()]
+        # the all-time queries do not depend on the selection, they run on the
+        # query pool while the page renders (see Query_layer.submit)
+        top_bottom_future = submit(load_top_bottom, data, "transaction_count", 5)
+
+        # year x quarter totals, also used by the year-wise pie chart below
+        periods = load_periods(data)
 
-        # fetch unique quarters
-        cursor.execute("SELECT DISTINCT quater FROM top_insurance ORDER BY quater;")
-        quarter = [row[0] for row in cursor.fetchall()]
+        # fetch unique years and quarters
+        year, quarter = period_options(periods)
 
         # streamlit applications
         col1,col2 = st.columns(2)
@@ -673,91 +608,58 @@ elif page == "Data Analysis":
 
         #------------ Query Part --------------
 
-        query_ins = """SELECT SUM (transaction_amount), SUM (transaction_count) FROM top_insurance WHERE year = %s AND quater = %s;"""
-        cursor.execute(query_ins,(selected_year,selected_quarter))
-        result = cursor.fetchone()
+        # totals, state level and all-time state sums in one query
+        page_data = load_page(data, selected_year, selected_quarter)
+        # warm the cache for the neighbouring quarters in the background (see Prefetch.py)
+        prefetch_quarters(periods, selected_year, selected_quarter, load_page, data)
 
-        total_amount = result[0] if result[0] is not None else 0 
-        total_count = result[1] if result[1] is not None else 0
+        total_amount = page_data["totals"]["transaction_amount"]
+        total_count = page_data["totals"]["transaction_count"]
         
         st.markdown(f"### Total Transaction Amount : {total_amount}",unsafe_allow_html = True)
         st.markdown(f"### Total Transaction Count : {total_count}", unsafe_allow_html=True)
         
         # --- Get State-wise Transaction_amount and transaction_count ---
 
-        cursor.execute("""
-        SELECT state, SUM(transaction_amount) as total_amount,
-        SUM(transaction_count) as total_count
-        FROM top_insurance
-        WHERE year = %s AND quater = %s
-        GROUP BY state
-        ORDER BY state;
-        """, (selected_year, selected_quarter))
-
-        data_rows = cursor.fetchall()
-        df_map = pd.DataFrame(data_rows, columns=['state', 'transaction_amount', 'transaction_count'])
-        df_map['transaction_amount'] = pd.to_numeric(df_map['transaction_amount'], errors='coerce')
-        df_map['transaction_count'] = pd.to_numeric(df_map['transaction_count'], errors='coerce')
-
-        state_name_map = {
-        'andaman-&-nicobar-islands': 'Andaman & Nicobar Island','andhra-pradesh' : 'Andhra Pradesh','arunachal-pradesh' : 'Arunachal Pradesh',
-        'assam': 'Assam', 'bihar' : 'Bihar', 'chandigarh' : 'Chandigarh', 'chhattisgarh' : 'Chhattisgarh',
-        'dadra-&-nagar-haveli-&-daman-&-diu': 'Dadra and Nagar Haveli', 'delhi': 'Delhi', 'goa' : 'Goa', 'gujarat' : 'Gujarat',
-        'haryana' : 'Haryana', 'himachal-pradesh' : 'Himachal Pradesh', 'jammu-&-kashmir' : 'Jammu & Kashmir', 'jharkhand' : 'Jharkhand',
-        'karnataka' : 'Karnataka', 'kerala' : 'Kerala', 'ladakh' : 'Ladakh', 'lakshadweep' : 'Lakshadweep', 'madhya-pradesh' : 'Madhya Pradesh',
-        'maharashtra' : 'Maharashtra', 'manipur' : 'Manipur', 'meghalaya' : 'Meghalaya', 'mizoram' : 'Mizoram', 'nagaland' : 'Nagaland',
-        'odisha': 'Odisha', 'puducherry': 'Puducherry', 'punjab' : 'Punjab', 'rajasthan' : 'Rajasthan', 'sikkim' : 'Sikkim',
-        'tamil-nadu' : 'Tamil Nadu', 'telangana' : 'Telangana', 'tripura' : 'Tripura', 'uttar-pradesh' : 'Uttar Pradesh',
-        'uttarakhand' : 'Uttarakhand', 'west-bengal' : 'West Bengal'
-        }
-
-        df_map['state'] = df_map['state'].replace(state_name_map)
-        # India GeoJSON for state boundaries
-        geojson_url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+        df_map = page_data["states"][['state', 'geo_key', 'transaction_amount', 'transaction_count']].copy()
 
-        # Choropleth Map
-        fig = px.choropleth(
-            df_map,
-            geojson=geojson_url,
-            featureidkey='properties.ST_NM',
-            locations='state',
-            color='transaction_amount',
-            hover_name='state',  
-            hover_data={
-                'transaction_amount': True,
-                'transaction_count': True
-            },
-            color_continuous_scale = 'Reds',
-            title=f"State-wise Transaction Amount - {selected_year} Q{selected_quarter}"
-        )
+        # India GeoJSON for state boundaries (local, simplified, see Geo_data.py)
+        india_geojson = india_states()
 
-        fig.update_geos(fitbounds="locations", visible=False)
+        # Choropleth Map
+        def build_map():
+            fig = px.choropleth(
+                df_map,
+                geojson=india_geojson,
+                featureidkey='properties.ST_NM',
+                locations='geo_key',
+                color='transaction_amount',
+                hover_name='state',  
+                hover_data={
+                    'transaction_amount': True,
+                    'transaction_count': True
+                },
+                color_continuous_scale = 'Reds',
+                title=f"State-wise Transaction Amount - {selected_year} Q{selected_quarter}"
+            )
+
+            fig.update_geos(fitbounds="locations", visible=False)
+            return fig
+
+        fig = cached_figure(data, "map", selected_year, selected_quarter, figure_tables, build_map)
         st.plotly_chart(fig, use_container_width=True)
 
+        st.subheader("🧭 Treemap: State → District by Insurance Amount")
+        district_drilldown("map_insurance", selected_year, selected_quarter, "transaction_amount", "Blues")
 
-        #--------  High Vs Low Trx States
-
-        # --- Sample query ---
-        query_trx = """
-            SELECT state, SUM(transaction_amount) AS total_amount,
-            SUM(transaction_count) AS total_count
-            FROM top_insurance
-            GROUP BY state
-            ORDER BY total_count DESC;
-        """
-        cursor.execute(query_trx)
-        rows = cursor.fetchall()
-
-        # --- Convert to DataFrame ---
-        df = pd.DataFrame(rows, columns=["State", "Total Transaction Amount", "Total Transaction Count"])
 
-        df_sorted = df.sort_values(by="Total Transaction Count", ascending=False)
-
-        # --- Top 5 states ---
-        top_10 = df_sorted.head(5).reset_index(drop=True)
+        #--------  High Vs Low Trx States
 
-        # --- Bottom 5 states ---
-        bottom_10 = df_sorted.tail(5).reset_index(drop=True)
+        # --- Top 5 and Bottom 5 states of the all-time sums ---
+        columns = {"state": "State", "transaction_amount": "Total Transaction Amount",
+                   "transaction_count": "Total Transaction Count"}
+        top_10, bottom_10 = (df.rename(columns=columns) for df in top_bottom_future.result())
+        bottom_10 = bottom_10.iloc[::-1].reset_index(drop=True)
 
 
         side1,side2 = st.columns(2)
@@ -772,18 +674,9 @@ elif page == "Data Analysis":
 
     # ----------------- Years wise sales =============
 
-        # --- SQL Query: Year-wise total sales ---
-        query_last = """
-            SELECT year, SUM(transaction_amount) AS total_amount
-            FROM top_insurance
-            GROUP BY year
-            ORDER BY year;
-        """
-        cursor.execute(query_last)
-        rows = cursor.fetchall()
-
-        # --- Convert to DataFrame ---
-        df = pd.DataFrame(rows, columns=["Year", "Total_Amount"])
+        # --- Year-wise total sales (see Analytics.yearly) ---
+        df = yearly(tables[0])[["year", "transaction_amount"]]
+        df.columns = ["Year", "Total_Amount"]
 
         # --- Pie Chart ---
         fig = px.pie(
@@ -793,8 +686,92 @@ elif page == "Data Analysis":
             title="🧾 Year-wise Sales Distribution",
         )
 
-        # Display in Streamlit
-        st.plotly_chart(fig, use_container_width=True)
+        # --- Compound annual growth, first to last quarter (see Analytics.cagr) ---
+        df_national = trends(tables[0], "national")
+        growth = cagr(df_national, [], "transaction_amount").iloc[0]
+        rate = growth["transaction_amount_cagr"]
 
+        # Display in Streamlit
+        pie_col, cagr_col = st.columns([3, 1])
+        with pie_col:
+            st.plotly_chart(fig, use_container_width=True)
+        with cagr_col:
+            st.metric("📈 Transaction Amount CAGR",
+                      f"{rate:.1%}" if pd.notna(rate) else "n/a",
+                      help=f"Compound annual growth from {df_national['period_label'].iloc[0]} "
+                           f"to {df_national['period_label'].iloc[-1]} ({growth['years']:.2f} years)")
+
+    # ==================  Device Brand / Transaction Type (OLAP cube) =========
+
+    elif data in CUBE_PAGES:
+        # every chart is a slice of the in-memory cube of the table (see Cube.py),
+        # no query runs per selection
+        data_cube = cube(tables[0])
+        member = data_cube.dimensions[-1]
+        member_label = "Brand" if data == "Device Brand" else "Transaction Type"
+        measure = data_cube.measures[-1]
+        if len(data_cube.measures) > 1:
+            measure = st.radio("Measure:", data_cube.measures, horizontal=True, index=len(data_cube.measures) - 1)
+        measure_label = measure.replace("transacion", "transaction").replace("_", " ").title()
+
+        year, quarter = period_options(data_cube.periods())
+
+        col1,col2,col3 = st.columns(3)
+        with col1:
+            selected_year = st.selectbox("Select the Year:", year)
+        with col2 :
+            selected_quarter = st.selectbox("Select the Quarter:", quarter)
+        with col3 :
+            selected_state = st.selectbox("Select the State:", ["All India"] + list(data_cube.members["state"]))
+
+        quarter_cube = data_cube.dice(year=selected_year, quater=selected_quarter)
+        if not quarter_cube.filled.any():
+            st.info(f"No {member_label.lower()} data for {selected_year} Q{selected_quarter}.")
+        else:
+            area_cube = quarter_cube if selected_state == "All India" else quarter_cube.slice("state", selected_state)
+            df_share = area_cube.rollup([member]).sort_values(by=measure, ascending=False)
+
+            st.subheader(f"🥧 {member_label} Share - {selected_state}, {selected_year} Q{selected_quarter}")
+            fig = px.pie(
+                df_share,
+                names=member,
+                values=measure,
+                hole=0.4,
+                labels={member: member_label, measure: measure_label},
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+            # state x member share of the quarter, each row sums to 100%
+            st.subheader(f"🗺️ {member_label} Share by State - {selected_year} Q{selected_quarter}")
+            df_states = quarter_cube.rollup(["state", member])
+            df_states["share"] = df_states[measure] / df_states.groupby("state")[measure].transform("sum")
+            heatmap = df_states.pivot(index="state", columns=member, values="share")
+            fig_heat = px.imshow(
+                heatmap,
+                color_continuous_scale="Purples",
+                aspect="auto",
+                labels={"x": member_label, "y": "State", "color": "Share"},
+            )
+            fig_heat.update_layout(height=900)
+            st.plotly_chart(fig_heat, use_container_width=True)
+
+        # member trend over every quarter, for the selected state
+        st.subheader(f"📈 {member_label} Trend - {selected_state}")
+        trend_cube = data_cube if selected_state == "All India" else data_cube.slice("state", selected_state)
+        df_trend = trend_cube.rollup(["year", "quater", member])
+        df_trend["period_label"] = period_label(df_trend["year"], df_trend["quater"])
+        fig_trend = px.line(
+            df_trend,
+            x="period_label",
+            y=measure,
+            color=member,
+            markers=True,
+            labels={"period_label": "Year - Quarter", measure: measure_label, member: member_label},
+        )
+        st.plotly_chart(fig_trend, use_container_width=True)
 
+    export_section(tables[0], selected_year, selected_quarter)
 
+# per-rerun breakdown of the profiled page
+if Profiler.active():
+    Profiler.render_panel(Profiler.finish_run())
@@ -1,7 +1,5 @@
-import pandas as pd
-import psycopg2
 #import requests
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from Ingestion import ingest
 
 # connection to existing db in postgresql
 # connection = psycopg2.connect(
@@ -19,40 +17,7 @@ from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 # cursor.close()
 # connection.close()
 
-# connect to phonepe db
-connection = psycopg2.connect(
-                              host = "localhost",
-                                port = 5432,
-                                user = "postgres",
-                                database = "phonepe_pulse_db",
-                                password = "jegan" )
+# create and load every pulse table of phonepe db (see Pulse_tables.py),
+# the tables are loaded in parallel over a small connection pool
 
-# table creation
-connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-
-cursor = connection.cursor()
-# cursor.execute("DROP TABLE IF EXISTS top_user")
-cursor.execute("""create table if not exists map_transaction (state TEXT,
-        year INT,
-        quater INT,
-        transaction_area TEXT,
-        transaction_count BIGINT,
-        transaction_amount BIGINT)""")
-
-df = pd.read_csv("Map_transaction.csv")
-for index, row in df.iterrows():
-    cursor.execute("""
-        INSERT INTO map_transaction (state, year, quater, transaction_area, transaction_count, transaction_amount)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """, (
-        row['State'],
-        row['Year'],
-        row['Quater'],
-        row['Transaction_area'],
-        row['Transaction_count'],
-        row['Transaction_amount']
-    ))
-
-connection.commit()
-cursor.close()
-print("Map_transaction table created succesfully")
+ingest()
@@ -0,0 +1,11 @@
+import os
+
+# connection settings of phonepe_pulse_db, shared by the loaders and the dashboard
+# (environment variables override the local defaults)
+DB_PARAMS = {
+    "host": os.environ.get("PULSE_DB_HOST", "localhost"),
+    "port": int(os.environ.get("PULSE_DB_PORT", 5432)),
+    "user": os.environ.get("PULSE_DB_USER", "postgres"),
+    "database": os.environ.get("PULSE_DB_NAME", "phonepe_pulse_db"),
+    "password": os.environ.get("PULSE_DB_PASSWORD", "jegan"),
+}
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from Query_cache import mark_loaded
+
+# state dimension: the pulse slugs ("andhra-pradesh") are mapped to a small
+# integer id once at ingestion, the fact tables store the id and the queries
+# join dim_state for the display name and the GeoJSON key of the choropleths
+# (properties.ST_NM of Geo_data.india_states)
+
+# (id, slug, display name, geojson key)
+STATES = [
+    (1, "andaman-&-nicobar-islands", "Andaman & Nicobar Islands", "Andaman & Nicobar Island"),
+    (2, "andhra-pradesh", "Andhra Pradesh", "Andhra Pradesh"),
+    (3, "arunachal-pradesh", "Arunachal Pradesh", "Arunachal Pradesh"),
+    (4, "assam", "Assam", "Assam"),
+    (5, "bihar", "Bihar", "Bihar"),
+    (6, "chandigarh", "Chandigarh", "Chandigarh"),
+    (7, "chhattisgarh", "Chhattisgarh", "Chhattisgarh"),
+    (8, "dadra-&-nagar-haveli-&-daman-&-diu", "Dadra & Nagar Haveli & Daman & Diu", "Dadra and Nagar Haveli"),
+    (9, "delhi", "Delhi", "Delhi"),
+    (10, "goa", "Goa", "Goa"),
+    (11, "gujarat", "Gujarat", "Gujarat"),
+    (12, "haryana", "Haryana", "Haryana"),
+    (13, "himachal-pradesh", "Himachal Pradesh", "Himachal Pradesh"),
+    (14, "jammu-&-kashmir", "Jammu & Kashmir", "Jammu & Kashmir"),
+    (15, "jharkhand", "Jharkhand", "Jharkhand"),
+    (16, "karnataka", "Karnataka", "Karnataka"),
+    (17, "kerala", "Kerala", "Kerala"),
+    (18, "ladakh", "Ladakh", "Ladakh"),
+    (19, "lakshadweep", "Lakshadweep", "Lakshadweep"),
+    (20, "madhya-pradesh", "Madhya Pradesh", "Madhya Pradesh"),
+    (21, "maharashtra", "Maharashtra", "Maharashtra"),
+    (22, "manipur", "Manipur", "Manipur"),
+    (23, "meghalaya", "Meghalaya", "Meghalaya"),
+    (24, "mizoram", "Mizoram", "Mizoram"),
+    (25, "nagaland", "Nagaland", "Nagaland"),
+    (26, "odisha", "Odisha", "Odisha"),
+    (27, "puducherry", "Puducherry", "Puducherry"),
+    (28, "punjab", "Punjab", "Punjab"),
+    (29, "rajasthan", "Rajasthan", "Rajasthan"),
+    (30, "sikkim", "Sikkim", "Sikkim"),
+    (31, "tamil-nadu", "Tamil Nadu", "Tamil Nadu"),
+    (32, "telangana", "Telangana", "Telangana"),
+    (33, "tripura", "Tripura", "Tripura"),
+    (34, "uttar-pradesh", "Uttar Pradesh", "Uttar Pradesh"),
+    (35, "uttarakhand", "Uttarakhand", "Uttarakhand"),
+    (36, "west-bengal", "West Bengal", "West Bengal"),
+]
+
+STATE_IDS = {slug: state_id for state_id, slug, _, _ in STATES}
+STATE_SLUGS = {state_id: slug for state_id, slug, _, _ in STATES}
+
+DIM_STATE_SQL = """create table if not exists dim_state (id SMALLINT PRIMARY KEY,
+        slug TEXT UNIQUE NOT NULL,
+        display_name TEXT NOT NULL,
+        geojson_key TEXT NOT NULL)"""
+
+
+def state_id(slug):
+    try:
+        return STATE_IDS[slug]
+    except KeyError:
+        raise ValueError(f"unknown state {slug!r}, add it to Dim_state.STATES") from None
+
+
+def state_ids(slugs):
+    # vectorized slug -> id of a column, fails on slugs missing from STATES
+    ids = slugs.map(STATE_IDS)
+    unknown = sorted(slugs[ids.isna()].unique())
+    if unknown:
+        raise ValueError(f"unknown states {unknown}, add them to Dim_state.STATES")
+    return ids.astype("int16")
+
+
+def sync_dim_state(cursor):
+    # creates dim_state and upserts STATES into it
+    cursor.execute(DIM_STATE_SQL)
+    for row in STATES:
+        cursor.execute("""INSERT INTO dim_state (id, slug, display_name, geojson_key) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (id) DO UPDATE SET slug = EXCLUDED.slug, display_name = EXCLUDED.display_name,
+                geojson_key = EXCLUDED.geojson_key""", row)
+    mark_loaded(cursor, ["dim_state"])
+
+
+def dim_state_frame():
+    # the dimension as a frame, for the DuckDB backend
+    return pd.DataFrame(STATES, columns=["id", "slug", "display_name", "geojson_key"])
@@ -0,0 +1,38 @@
+from Pulse_tables import TABLES_BY_NAME
+from Query_layer import fetch_frame
+from Rollups import rollup_name, summed_columns
+
+# lazy state -> district drill-down of the map tables: a page first loads the
+# ~36 state rows of the quarter from the <table>_by_state rollup, the district
+# rows of a state are only fetched once the user drills into it. Both go
+# through the query cache (Query_layer.fetch_frame), so a state opened once is
+# served from memory for every session until the table is reloaded.
+
+DRILLDOWN_TABLES = ["map_transaction", "map_users", "map_insurance"]
+
+
+def states_sql(table):
+    measures = ", ".join(f"r.{col}" for col in summed_columns(TABLES_BY_NAME[table]))
+    return f"""SELECT r.state_id, s.display_name AS state, s.geojson_key AS geo_key, {measures}
+        FROM {rollup_name(table, 'by_state')} r JOIN dim_state s ON s.id = r.state_id
+        WHERE r.year = %s AND r.quater = %s
+        ORDER BY s.display_name"""
+
+
+def districts_sql(table):
+    # served by the (year, quater, state_id) index of the table's year partition
+    spec = TABLES_BY_NAME[table]
+    measures = summed_columns(spec)
+    return f"""SELECT {spec['area']}, {', '.join(measures)} FROM {table}
+        WHERE year = %s AND quater = %s AND state_id = %s
+        ORDER BY {measures[0]} DESC, {spec['area']}"""
+
+
+def load_states(table, year, quarter):
+    # state level of the quarter: state_id, state, geo_key and the measures
+    return fetch_frame(states_sql(table), (year, quarter))
+
+
+def load_districts(table, state_id, year, quarter):
+    # district rows of one state, largest first
+    return fetch_frame(districts_sql(table), (year, quarter, int(state_id)))
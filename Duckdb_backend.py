@@ -0,0 +1,58 @@
+import os
+import threading
+
+import duckdb
+
+from Dim_state import dim_state_frame
+from Parquet_store import PARQUET_DIR, table_path
+from Pulse_tables import TABLES
+from Rollups import ROLLUPS, rollup_sql
+
+# embedded query backend for analytics-only deployments: the Parquet datasets
+# written by Parquet_store.py are scanned by an in-process DuckDB, no database
+# server needed. Selected with PULSE_BACKEND=duckdb (see Query_layer.py).
+# Every registry table is exposed as a view with the same name and the rollups
+# are computed once at startup, so the dashboard sql runs unchanged.
+
+_connection = None
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _connect(parquet_dir):
+    connection = duckdb.connect(database=":memory:")
+    states = dim_state_frame()
+    connection.execute("CREATE TABLE dim_state AS SELECT * FROM states")
+    for spec in TABLES:
+        path = table_path(spec["table"], parquet_dir)
+        if not os.path.isdir(path):
+            continue
+        pattern = os.path.join(path, "**", "*.parquet").replace("\\", "/")
+        connection.execute(f"""CREATE VIEW {spec['table']} AS
+            SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)""")
+        for level in ROLLUPS:
+            create_view = rollup_sql(spec, level)[0]
+            connection.execute(create_view.replace("CREATE MATERIALIZED VIEW IF NOT EXISTS", "CREATE TABLE"))
+    return connection
+
+
+def get_cursor(parquet_dir=PARQUET_DIR):
+    # one duckdb cursor per thread on top of a shared in-memory database
+    global _connection
+    if _connection is None:
+        with _lock:
+            if _connection is None:
+                _connection = _connect(parquet_dir)
+    cursor = getattr(_local, "cursor", None)
+    if cursor is None:
+        cursor = _local.cursor = _connection.cursor()
+    return cursor
+
+
+def execute(query, params, fetch):
+    # same contract as Query_layer._execute, psycopg2 placeholders included
+    cursor = get_cursor()
+    result = cursor.execute(query.replace("%s", "?"), list(params or ()))
+    if fetch == "frame":
+        return result.df()
+    return result.fetchall() if fetch == "all" else result.fetchone()
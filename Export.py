@@ -0,0 +1,182 @@
+import csv
+import io
+import itertools
+import os
+import re
+import tempfile
+import threading
+
+import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from Db_config import DB_PARAMS
+from Pulse_tables import TABLES_BY_NAME, measure_columns
+from Query_layer import BACKEND, fetch_one
+from Typed_frames import fact_sql
+
+# streaming export of the raw rows behind a dashboard view: the (year,
+# quarter, optional state) slice of a fact table is read from a server-side
+# (named) cursor EXPORT_CHUNK_ROWS rows at a time and written chunk by chunk
+# as csv or parquet, so only one chunk is in memory whatever the slice size.
+# Exports run on their own connections, at most EXPORT_SLOTS at once, and
+# never hold a connection of the dashboard query pool (Query_layer.py).
+# st.download_button reads the whole file into Streamlit's in-memory media
+# storage, so downloads from the dashboard are refused above EXPORT_MAX_ROWS;
+# larger slices go through the command line (python Export.py), which
+# streams to disk in constant memory and has no cap.
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("PULSE_EXPORT_CHUNK_ROWS", 10000))
+EXPORT_SLOTS = int(os.environ.get("PULSE_EXPORT_SLOTS", 2))
+# exports larger than this spill from memory to a temporary file
+EXPORT_SPOOL_MB = float(os.environ.get("PULSE_EXPORT_SPOOL_MB", 8))
+# largest slice served as a dashboard download
+EXPORT_MAX_ROWS = int(os.environ.get("PULSE_EXPORT_MAX_ROWS", 200000))
+
+# format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# sql type -> arrow type of the parquet columns
+ARROW_TYPES = {
+    "SMALLINT": pa.int16(),
+    "INT": pa.int32(),
+    "BIGINT": pa.int64(),
+    "FLOAT": pa.float64(),
+    "TEXT": pa.string(),
+}
+
+_slots = threading.BoundedSemaphore(EXPORT_SLOTS)
+_cursor_ids = itertools.count()
+
+
+def export_columns(table):
+    spec = TABLES_BY_NAME[table]
+    return ["state", "year", "quater", spec["area"]] + measure_columns(spec)
+
+
+def arrow_type(sql_type):
+    # NUMERIC(p,s) columns arrive as Decimal from psycopg2
+    match = re.fullmatch(r"NUMERIC\((\d+),\s*(\d+)\)", sql_type)
+    if match:
+        return pa.decimal128(int(match.group(1)), int(match.group(2)))
+    return ARROW_TYPES[sql_type]
+
+
+def export_schema(table):
+    types = {col: arrow_type(sql_type) for _, col, sql_type in TABLES_BY_NAME[table]["columns"]}
+    types["state"] = pa.string()
+    return pa.schema([(col, types[col]) for col in export_columns(table)])
+
+
+def export_sql(table, state_id=None):
+    # rows of one quarter (year, quater params), optionally of one state
+    sql = f"{fact_sql(table)} WHERE f.year = %s AND f.quater = %s"
+    if state_id is not None:
+        sql += " AND f.state_id = %s"
+    return f"{sql} ORDER BY f.state_id, f.{TABLES_BY_NAME[table]['area']}"
+
+
+def export_count_sql(table, state_id=None):
+    sql = f"SELECT COUNT(*) FROM {table} WHERE year = %s AND quater = %s"
+    return sql + (" AND state_id = %s" if state_id is not None else "")
+
+
+def export_rows(table, year, quarter, state_id=None):
+    # row count of the slice, through the query cache
+    params = [year, quarter] + ([int(state_id)] if state_id is not None else [])
+    return int(fetch_one(export_count_sql(table, state_id), params)[0])
+
+
+def export_file_name(table, year, quarter, state=None, fmt="csv"):
+    state = f"_{state.lower().replace(' & ', '_').replace(' ', '_')}" if state else ""
+    return f"{table}_{year}_q{quarter}{state}.{EXPORT_FORMATS[fmt][0]}"
+
+
+def iter_chunks(table, year, quarter, state_id=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # lists of up to chunk_rows row tuples of the slice
+    params = [year, quarter] + ([int(state_id)] if state_id is not None else [])
+    sql = export_sql(table, state_id)
+    with _slots:
+        if BACKEND == "duckdb":
+            from Duckdb_backend import get_cursor
+            cursor = get_cursor().execute(sql.replace("%s", "?"), params)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+        connection = psycopg2.connect(**DB_PARAMS)
+        try:
+            # a named cursor keeps the result on the server, every fetchmany
+            # is one FETCH of chunk_rows rows; it needs a transaction
+            with connection, connection.cursor(name=f"pulse_export_{next(_cursor_ids)}") as cursor:
+                cursor.itersize = chunk_rows
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        return
+                    yield rows
+        finally:
+            connection.close()
+
+
+def write_csv(chunks, fh, columns):
+    # fh: binary file object, written as utf-8 csv with a header row
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        rows += len(chunk)
+    # the caller keeps fh, only the wrapper is let go
+    text.detach()
+    return rows
+
+
+def write_parquet(chunks, fh, schema):
+    # one row group per chunk
+    rows = 0
+    with pq.ParquetWriter(fh, schema) as writer:
+        for chunk in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def export(fh, table, year, quarter, state_id=None, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    # streams the slice into the binary file object fh, returns the row count
+    chunks = iter_chunks(table, year, quarter, state_id, chunk_rows)
+    if fmt == "parquet":
+        return write_parquet(chunks, fh, export_schema(table))
+    if fmt == "csv":
+        return write_csv(chunks, fh, export_columns(table))
+    raise ValueError(f"unknown export format {fmt!r}, use one of {list(EXPORT_FORMATS)}")
+
+
+def export_spooled(table, year, quarter, state_id=None, fmt="csv"):
+    # the export as a readable file object, in memory up to EXPORT_SPOOL_MB
+    # and in a temporary file beyond that (st.download_button data)
+    rows = export_rows(table, year, quarter, state_id)
+    if rows > EXPORT_MAX_ROWS:
+        raise ValueError(f"{rows} rows is over the {EXPORT_MAX_ROWS} row download limit, "
+                         f"use python Export.py {table} {year} {quarter}")
+    fh = tempfile.SpooledTemporaryFile(max_size=int(EXPORT_SPOOL_MB * 1024 * 1024))
+    export(fh, table, year, quarter, state_id, fmt)
+    fh.seek(0)
+    return fh
+
+
+if __name__ == "__main__":
+    import sys
+    # python Export.py <table> <year> <quarter> [csv|parquet]
+    table, year, quarter = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    fmt = sys.argv[4] if len(sys.argv) > 4 else "csv"
+    name = export_file_name(table, year, quarter, fmt=fmt)
+    with open(name, "wb") as out:
+        print(f"{export(out, table, year, quarter, fmt=fmt)} rows -> {name}")
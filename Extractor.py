@@ -0,0 +1,186 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from Dim_state import STATE_SLUGS, state_ids
+from Pulse_tables import TABLES_BY_NAME, csv_columns, integer_columns, measure_columns, table_columns
+
+# extraction of the cloned pulse repository (Repo_clone.py) in one pass:
+# every state level json file of aggregated/map/top x transaction/user/insurance
+# is parsed in a process pool and streamed out as typed DataFrame batches
+
+
+# ---------- parsers, one per dataset, each returns the area rows of one file ----------
+
+def _aggregated_payments(data):
+    for z in data.get("transactionData") or []:
+        instrument = z["paymentInstruments"][0]
+        yield z["name"], instrument["count"], instrument["amount"]
+
+
+def _aggregated_users(data):
+    for z in data.get("usersByDevice") or []:
+        yield z["brand"], z["count"], z["percentage"]
+
+
+def _map_hover_payments(data):
+    for z in data.get("hoverDataList") or []:
+        yield z["name"], z["metric"][0]["count"], z["metric"][0]["amount"]
+
+
+def _map_hover_users(data):
+    for name, values in (data.get("hoverData") or {}).items():
+        yield name, values.get("registeredUsers", 0), values.get("appOpens", 0)
+
+
+def _top_entities(data):
+    # districts if present, else pincodes, else states
+    for key in ("districts", "pincodes", "states"):
+        if data.get(key):
+            return data[key]
+    return []
+
+
+def _top_payments(data):
+    for z in _top_entities(data):
+        if z.get("metric") is not None:
+            yield z["entityName"], z["metric"]["count"], z["metric"]["amount"]
+
+
+def _top_users(data):
+    for z in _top_entities(data):
+        yield z.get("name", z.get("entityName")), z["registeredUsers"]
+
+
+# (section, dataset, hover) -> (table, parser)
+DATASETS = {
+    ("aggregated", "transaction", False): ("aggregation_trx", _aggregated_payments),
+    ("aggregated", "insurance", False): ("aggregation_ins", _aggregated_payments),
+    ("aggregated", "user", False): ("aggregation_user", _aggregated_users),
+    ("map", "transaction", True): ("map_transaction", _map_hover_payments),
+    ("map", "insurance", True): ("map_insurance", _map_hover_payments),
+    ("map", "user", True): ("map_users", _map_hover_users),
+    ("top", "transaction", False): ("top_transaction", _top_payments),
+    ("top", "insurance", False): ("top_insurance", _top_payments),
+    ("top", "user", False): ("top_user", _top_users),
+}
+
+
+def classify(relative_path):
+    # data/<section>/<dataset>/[hover/]country/india/state/<state>/<year>/<q>.json
+    # -> (table, state, year, quater), None for country level and unknown files
+    parts = relative_path.replace("\\", "/").split("/")
+    if parts and parts[0] == "data":
+        parts = parts[1:]
+    if len(parts) < 7 or not parts[-1].endswith(".json"):
+        return None
+    hover = parts[2] == "hover"
+    rest = parts[3:] if hover else parts[2:]
+    if rest[:3] != ["country", "india", "state"] or len(rest) != 6:
+        return None
+    dataset = DATASETS.get((parts[0], parts[1], hover))
+    if dataset is None:
+        return None
+    return dataset[0], rest[3], int(rest[4]), int(rest[5][:-len(".json")])
+
+
+def walk(root):
+    # every state level file of the clone as (path, table, state, year, quater)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            target = classify(os.path.relpath(path, root))
+            if target is not None:
+                yield (path,) + target
+
+
+DATASETS_BY_TABLE = {table: parser for table, parser in DATASETS.values()}
+
+
+def parse_file(path, table, state, year, quater):
+    # rows of one json file as tuples in table column order
+    parser = DATASETS_BY_TABLE[table]
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh).get("data") or {}
+    return [(state, year, quater) + tuple(values) for values in parser(data)]
+
+
+def _parse_chunk(files):
+    # worker task: parse a chunk of files, rows grouped by table
+    rows = {}
+    for entry in files:
+        rows.setdefault(entry[1], []).extend(parse_file(*entry))
+    return rows
+
+
+def to_frame(table, rows):
+    # typed columnar batch in the layout of the table registry
+    spec = TABLES_BY_NAME[table]
+    df = pd.DataFrame.from_records(rows, columns=table_columns(spec))
+    df["state_id"] = state_ids(df["state_id"])
+    for col in measure_columns(spec):
+        df[col] = pd.to_numeric(df[col])
+    for col in integer_columns(spec):
+        df[col] = df[col].round().astype("int64")
+    return df
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract(root, batch_size=50_000, workers=None, files_per_task=64):
+    # yields (table, DataFrame) batches of at most batch_size rows;
+    # only a few tasks are in flight at a time so memory stays bounded
+    workers = workers or os.cpu_count() or 1
+    buffers = {}
+
+    def drain(result, final=False):
+        for table, rows in result.items():
+            buffer = buffers.setdefault(table, [])
+            buffer.extend(rows)
+            while len(buffer) >= batch_size or (final and buffer):
+                yield table, to_frame(table, buffer[:batch_size])
+                del buffer[:batch_size]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(walk(root), files_per_task):
+            pending.append(executor.submit(_parse_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from drain(pending.popleft().result())
+        while pending:
+            yield from drain(pending.popleft().result())
+    yield from drain({table: [] for table in buffers}, final=True)
+
+
+def extract_to_csv(root, out_dir=".", **kwargs):
+    # writes the csv files of the table registry, appending batch by batch
+    written = {}
+    for table, df in extract(root, **kwargs):
+        spec = TABLES_BY_NAME[table]
+        out = df.copy()
+        # the csv files keep the pulse slugs
+        out["state_id"] = out["state_id"].map(STATE_SLUGS)
+        out.columns = csv_columns(spec)
+        path = os.path.join(out_dir, spec["csv"])
+        out.to_csv(path, mode="a" if table in written else "w", header=table not in written, index=False)
+        written[table] = written.get(table, 0) + len(out)
+    for table, rows in written.items():
+        print(f"{TABLES_BY_NAME[table]['csv']}: {rows} rows")
+    return written
+
+
+if __name__ == "__main__":
+    import sys
+    extract_to_csv(sys.argv[1] if len(sys.argv) > 1 else "data")
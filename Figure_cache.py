@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from Profiler import span
+from Query_cache import data_version, polled_versions
+
+# cache of built plotly figures as serialized json, keyed on
+# (page, chart, year, quarter, data version): a popular view is rebuilt once
+# per data load instead of once per user and rerun. Entries are evicted LRU
+# once the cached json exceeds FIGURE_CACHE_MB; with PULSE_FIGURE_CACHE_DIR
+# set they are also written to disk and survive restarts. The data version
+# comes from Query_cache.data_version of the relations the figure reads (the
+# rollup and dim_state, not the base table whose load commits before the
+# rollup refresh), so a reload changes the key and stale figures are never
+# served. Only figures whose relations have a version in table_versions go to
+# disk: without one (DuckDB backend) the key would survive a data change.
+# On disk a newer version of a view replaces the older one's file, and the
+# directory is held to the same FIGURE_CACHE_MB, oldest files removed first.
+
+FIGURE_CACHE_MB = float(os.environ.get("PULSE_FIGURE_CACHE_MB", 64))
+FIGURE_CACHE_DIR = os.environ.get("PULSE_FIGURE_CACHE_DIR")
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()
+
+
+class FigureCache:
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MB * 1024 * 1024, directory=FIGURE_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries = OrderedDict()  # key -> json
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        # keys end in the data version: <view hash>-<version hash>.json
+        return os.path.join(self.directory, f"{_digest(key[:-1])}-{_digest(key[-1])}.json")
+
+    def get(self, key, persist=True):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if persist and self.directory:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as fh:
+                    value = fh.read()
+            except FileNotFoundError:
+                pass
+            else:
+                self._store(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def put(self, key, value, persist=True):
+        self._store(key, value)
+        if persist and self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            # written under a temporary name so readers never see half a file
+            tmp = self._path(key) + f".{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(value)
+            os.replace(tmp, self._path(key))
+            self._evict_files(key)
+
+    def _evict_files(self, key):
+        # drops the other versions of the view, then the oldest files while
+        # the directory is over max_bytes
+        path = self._path(key)
+        view = os.path.basename(path).split("-")[0]
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json") or entry.path == path:
+                continue
+            try:
+                if entry.name.split("-")[0] == view:
+                    os.remove(entry.path)
+                else:
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                pass  # removed by another process
+        size = os.path.getsize(path) + sum(file_size for _, file_size, _ in files)
+        for _, file_size, file_path in sorted(files):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def figure(self, page, chart, year, quarter, tables, build):
+        # the cached figure of the view, built with build() on a miss
+        key = (page, chart, year, quarter, data_version(tables))
+        persist = all(version is not None for version in polled_versions(tables))
+        value = self.get(key, persist)
+        if value is not None:
+            with span("figure cache", chart):
+                return pio.from_json(value)
+        fig = build()
+        self.put(key, fig.to_json(), persist)
+        return fig
+
+
+figure_cache = FigureCache()
+
+
+def cached_figure(page, chart, year, quarter, tables, build):
+    return figure_cache.figure(page, chart, year, quarter, tables, build)
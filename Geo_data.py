@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import urllib.request
+
+# local copy of the india state boundaries used by every choropleth, loaded once
+# per process, with pre-simplified geometry at a few tolerance levels.
+# `python Geo_data.py` vendors the file into geo/ and writes the simplified
+# levels, to be committed with the repo; the dashboard only reads geo/, it
+# never downloads or writes there. Without a vendored copy the charts get the
+# remote url and the browser fetches the boundaries itself.
+
+GEOJSON_URL = ("https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/"
+               "e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson")
+
+GEO_DIR = os.environ.get("PULSE_GEO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "geo"))
+STATES_FILE = "india_states.geojson"
+
+# Douglas-Peucker tolerance (degrees) and coordinate precision per level
+LEVELS = {
+    "full": (0.0, 6),
+    "medium": (0.005, 4),
+    "low": (0.02, 3),
+}
+DEFAULT_LEVEL = os.environ.get("PULSE_GEO_LEVEL", "medium")
+
+
+def _level_path(name, level):
+    if level == "full":
+        return os.path.join(GEO_DIR, name)
+    return os.path.join(GEO_DIR, name.replace(".geojson", f".{level}.geojson"))
+
+
+# ---------- geometry simplification ----------
+
+def _point_line_distance(point, start, end):
+    (x, y), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+    return ((x - x1 - t * dx) ** 2 + (y - y1 - t * dy) ** 2) ** 0.5
+
+
+def simplify_line(points, tolerance):
+    # iterative Douglas-Peucker, keeps the end points
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        index, distance = None, tolerance
+        for i in range(first + 1, last):
+            d = _point_line_distance(points[i], points[first], points[last])
+            if d > distance:
+                index, distance = i, d
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _simplify_ring(ring, tolerance, precision):
+    simplified = simplify_line(ring, tolerance)
+    # a closed ring needs at least 4 points, tiny islands keep their shape
+    if len(simplified) < 4:
+        simplified = ring
+    return [[round(x, precision), round(y, precision)] for x, y, *_ in simplified]
+
+
+def simplify_geometry(geometry, tolerance, precision):
+    if geometry["type"] == "Polygon":
+        rings = [_simplify_ring(r, tolerance, precision) for r in geometry["coordinates"]]
+        return {"type": "Polygon", "coordinates": rings}
+    if geometry["type"] == "MultiPolygon":
+        polygons = [[_simplify_ring(r, tolerance, precision) for r in polygon]
+                    for polygon in geometry["coordinates"]]
+        return {"type": "MultiPolygon", "coordinates": polygons}
+    return geometry
+
+
+def simplify(geojson, level):
+    tolerance, precision = LEVELS[level]
+    features = [{"type": "Feature", "properties": feature["properties"],
+                 "geometry": simplify_geometry(feature["geometry"], tolerance, precision)}
+                for feature in geojson["features"]]
+    return {"type": "FeatureCollection", "features": features}
+
+
+# ---------- loading ----------
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write(path, geojson):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(geojson, fh, separators=(",", ":"))
+
+
+def vendor_states(source=GEOJSON_URL):
+    # copies the state boundaries (url or local file) into geo/ and writes
+    # every simplified level; a setup step, never run by the dashboard
+    if os.path.exists(source):
+        geojson = _read(source)
+    else:
+        with urllib.request.urlopen(source, timeout=30) as response:
+            geojson = json.load(response)
+    for level in LEVELS:
+        _write(_level_path(STATES_FILE, level), simplify(geojson, level))
+    return geojson
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def india_states(level=DEFAULT_LEVEL):
+    # state boundaries (featureidkey 'properties.ST_NM') at the given level,
+    # simplified in memory when only the full file is vendored; the remote url
+    # when nothing is, not cached so a later vendoring is picked up
+    with _loaded_lock:
+        if level in _loaded:
+            return _loaded[level]
+    path = _level_path(STATES_FILE, level)
+    full_path = _level_path(STATES_FILE, "full")
+    if os.path.exists(path):
+        geojson = _read(path)
+    elif os.path.exists(full_path):
+        geojson = simplify(_read(full_path), level)
+    else:
+        return GEOJSON_URL
+    with _loaded_lock:
+        _loaded[level] = geojson
+    return geojson
+
+
+if __name__ == "__main__":
+    import sys
+    # python Geo_data.py [url or india_states.geojson]
+    vendor_states(*sys.argv[1:2])
+    for level in LEVELS:
+        path = _level_path(STATES_FILE, level)
+        print(f"{path}: {os.path.getsize(path) / 1024:,.0f} KB")
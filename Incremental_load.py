@@ -0,0 +1,114 @@
+import os
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from Db_config import DB_PARAMS
+from Dim_state import state_id, sync_dim_state
+from Extractor import classify, parse_file, to_frame, walk
+from Load_manifest import file_hash, loaded_hashes, record_loaded
+from Pulse_tables import TABLES_BY_NAME, create_table_sql, index_sql, measure_columns, partition_sql, table_columns
+from Query_cache import mark_loaded
+from Rollups import build_rollups
+
+# incremental (delta) ingestion: only the state/year/quarter json files that are
+# new or changed since the last load are parsed and upserted; a content-hash
+# manifest in the db remembers what has been loaded (Load_manifest.py)
+
+
+def changed_files(root, connection, repo=None, since_commit=None):
+    # (path, table, state, year, quater, sha256) of every file to (re)load;
+    # with a commit the candidates come from git diff, otherwise the whole tree
+    if repo is not None and since_commit is not None:
+        names = repo.git.diff("--name-only", since_commit, "HEAD").splitlines()
+        candidates = []
+        for name in names:
+            path = os.path.join(repo.working_tree_dir, name)
+            target = classify(os.path.relpath(path, root))
+            if target is not None and os.path.exists(path):
+                candidates.append((path,) + target)
+    else:
+        candidates = list(walk(root))
+
+    with connection.cursor() as cursor:
+        loaded = loaded_hashes(cursor)
+    connection.commit()
+
+    changed = []
+    for entry in candidates:
+        key = os.path.relpath(entry[0], root)
+        digest = file_hash(entry[0])
+        if loaded.get(key) != digest:
+            changed.append(entry + (digest,))
+    return changed
+
+
+def upsert_sql(spec):
+    columns = table_columns(spec)
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in measure_columns(spec))
+    return f"""INSERT INTO {spec['table']} ({', '.join(columns)}) VALUES %s
+        ON CONFLICT ({', '.join(spec['primary_key'])}) DO UPDATE SET {updates}"""
+
+
+def upsert_files(connection, root, files):
+    # upserts the rows of the changed files, one transaction per table;
+    # areas that vanished from a changed quarter file are deleted
+    by_table = {}
+    for entry in files:
+        by_table.setdefault(entry[1], []).append(entry)
+
+    with connection, connection.cursor() as cursor:
+        sync_dim_state(cursor)
+
+    stats = {}
+    for table, entries in by_table.items():
+        spec = TABLES_BY_NAME[table]
+        rows = []
+        for path, _, state, year, quater, _ in entries:
+            rows.extend(parse_file(path, table, state, year, quater))
+        # one row per natural key, a key twice in one upsert statement is an error
+        df = to_frame(table, rows).drop_duplicates(spec["primary_key"], keep="last")
+
+        with connection:
+            with connection.cursor() as cursor:
+                cursor.execute(create_table_sql(spec))
+                # the same indexes as Bulk_loader.load_table
+                for statement in index_sql(spec):
+                    cursor.execute(statement)
+                for year in sorted({entry[3] for entry in entries}):
+                    cursor.execute(partition_sql(spec, year))
+                for path, _, state, year, quater, digest in entries:
+                    areas = df.loc[(df["state_id"] == state_id(state)) & (df["year"] == year)
+                                   & (df["quater"] == quater), spec["area"]].tolist()
+                    cursor.execute(f"""DELETE FROM {table}
+                        WHERE state_id = %s AND year = %s AND quater = %s AND NOT ({spec['area']} = ANY(%s))""",
+                                   (state_id(state), year, quater, areas))
+                if len(df):
+                    execute_values(cursor, upsert_sql(spec), list(df.itertuples(index=False, name=None)),
+                                   page_size=1000)
+                record_loaded(cursor, [(os.path.relpath(e[0], root), table, e[5]) for e in entries])
+                mark_loaded(cursor, [table])
+        build_rollups(connection, [table])
+        stats[table] = len(df)
+        print(f"{table}: {len(entries)} files, {len(df)} rows upserted")
+    return stats
+
+
+def refresh(destination=None, pull=True):
+    # quarterly refresh: pull the clone, then load only what changed
+    from Repo_clone import destination as default_destination, update_repo
+
+    destination = destination or default_destination
+    repo, previous = update_repo(destination) if pull else (None, None)
+    connection = psycopg2.connect(**DB_PARAMS)
+    try:
+        files = changed_files(destination, connection, repo, previous)
+        print(f"{len(files)} new or changed files")
+        return upsert_files(connection, destination, files)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    import sys
+    refresh(sys.argv[1] if len(sys.argv) > 1 else None)
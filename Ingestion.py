@@ -0,0 +1,93 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.pool import ThreadedConnectionPool
+
+from Bulk_loader import load_table
+from Db_config import DB_PARAMS
+from Dim_state import sync_dim_state
+from Load_manifest import csv_inputs, duplicate_files, file_hash, loaded_hashes
+from Pulse_tables import TABLES, TABLES_BY_NAME
+from Query_cache import TABLE_VERSIONS_SQL
+from Rollups import build_rollups
+
+# ingestion pipeline: loads every table of the registry in parallel,
+# each worker borrows its own connection from a small pool. Inputs are
+# fingerprinted first (Load_manifest.py): a csv already loaded with the same
+# sha256 is skipped unless force=True, and byte-identical csv copies are
+# reported and never loaded twice. A normal run replaces the year partitions
+# in place and refreshes the rollups concurrently, rebuild=True (--rebuild)
+# drops and recreates the tables and their rollups after a schema change
+
+
+def _load_with_pool(pool, spec, rebuild, digest):
+    connection = pool.getconn()
+    try:
+        stats = load_table(connection, spec, rebuild, digest)
+        if not rebuild:
+            # a rebuild already recreated them in the load's transaction
+            build_rollups(connection, [spec["table"]])
+        return stats
+    finally:
+        pool.putconn(connection)
+
+
+def report_duplicate_inputs(directory="."):
+    # byte-identical csv files next to the registered ones
+    registered = [os.path.join(directory, spec["csv"]) for spec in TABLES]
+    for original, copies in duplicate_files(csv_inputs(directory), registered).items():
+        for copy in copies:
+            print(f"{os.path.basename(copy)} is a byte-identical copy of {os.path.basename(original)}, not loaded")
+
+
+def _unchanged(cursor, spec, digest, loaded):
+    # the csv was loaded into the table with the same content and the table still exists
+    if loaded.get(spec["csv"]) != digest:
+        return False
+    cursor.execute("SELECT to_regclass(%s)", (spec["table"],))
+    return cursor.fetchone()[0] is not None
+
+
+def ingest(table_names=None, rebuild=False, workers=4, force=False):
+    # load the given tables (default: all of them), returns {table: (rows, seconds)}
+    specs = [TABLES_BY_NAME[name] for name in table_names] if table_names else TABLES
+    report_duplicate_inputs()
+    digests = {spec["table"]: file_hash(spec["csv"]) for spec in specs}
+
+    start = time.perf_counter()
+    pool = ThreadedConnectionPool(1, max(1, min(workers, len(specs))), **DB_PARAMS)
+    try:
+        # created up front so the parallel loads do not race on them
+        connection = pool.getconn()
+        with connection, connection.cursor() as cursor:
+            cursor.execute(TABLE_VERSIONS_SQL)
+            sync_dim_state(cursor)
+            loaded = loaded_hashes(cursor)
+            skipped = [] if force or rebuild else [spec for spec in specs
+                                                   if _unchanged(cursor, spec, digests[spec["table"]], loaded)]
+        pool.putconn(connection)
+        for spec in skipped:
+            print(f"{spec['table']}: {spec['csv']} unchanged since the last load, skipped")
+        specs = [spec for spec in specs if spec not in skipped]
+        workers = max(1, min(workers, len(specs)))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {spec["table"]: executor.submit(_load_with_pool, pool, spec, rebuild, digests[spec["table"]])
+                       for spec in specs}
+            stats = {table: future.result() for table, future in futures.items()}
+    finally:
+        pool.closeall()
+
+    total_rows = sum(rows for rows, _ in stats.values())
+    elapsed = time.perf_counter() - start
+    print(f"{len(stats)} tables, {total_rows} rows loaded in {elapsed:.2f}s")
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+    # python Ingestion.py [--force] [--rebuild] [table ...]
+    flags = {"--force", "--rebuild"}
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    ingest(args or None, rebuild="--rebuild" in sys.argv[1:], force="--force" in sys.argv[1:])
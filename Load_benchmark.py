@@ -0,0 +1,243 @@
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+
+from Bulk_loader import attach_year, copy_dataframe, read_pulse_csv
+from Db_config import DB_PARAMS
+from Pulse_tables import TABLES_BY_NAME, create_table_sql, index_sql, measure_columns, partition_sql, table_columns
+
+# ingestion throughput benchmark of the loader strategies, run against the
+# Map_transaction, Map_User and Top_* csv files at their own size and scaled
+# up synthetically (every area repeated with a suffix, measures +-15% noise).
+# every strategy loads into fresh tables of schema bench_load, in its own
+# process; reports wall time, rows/sec and the loader's memory: the peak RSS
+# sampled during the load minus the RSS before it (the input frames excluded)
+
+SCHEMA = "bench_load"
+BENCH_TABLES = ["map_transaction", "map_users", "top_transaction", "top_user", "top_insurance"]
+EXECUTE_VALUES_PAGE_SIZES = [100, 1000, 10000]
+RSS_SAMPLE_SECONDS = 0.01
+
+
+def scaled_frame(spec, scale, seed=0, rows=None):
+    # the csv rows repeated `scale` times, the primary key stays unique;
+    # with rows only the copies needed for the first `rows` rows are built
+    df = read_pulse_csv(spec)
+    if rows is not None:
+        scale = min(scale, -(-rows // len(df)))
+    if scale == 1:
+        return df if rows is None else df.head(rows)
+    rng = np.random.default_rng(seed)
+    copies = []
+    for i in range(scale):
+        copy = df.copy()
+        if i:
+            copy[spec["area"]] = copy[spec["area"]] + f" {i}"
+            for col in measure_columns(spec):
+                copy[col] = (copy[col] * rng.uniform(0.85, 1.15, len(copy))).round().astype("int64")
+        copies.append(copy)
+    df = pd.concat(copies, ignore_index=True)
+    return df if rows is None else df.head(rows)
+
+
+def rss_mb():
+    # current resident set size of this process (linux)
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class RssSampler:
+    # peak RSS of the process while the with block runs, sampled in a thread
+
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.baseline = self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self.baseline = self.peak = rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def _insert_sql(spec, row_placeholders=True):
+    # row_placeholders=False leaves the single %s execute_values expands
+    columns = table_columns(spec)
+    values = "(" + ", ".join(["%s"] * len(columns)) + ")" if row_placeholders else "%s"
+    return f"INSERT INTO {spec['table']} ({', '.join(columns)}) VALUES {values}"
+
+
+# ---------- strategies: (connection, spec, df) -> rows ----------
+
+def load_iterrows(connection, spec, df):
+    # the original Database_connection.py loop, one execute per row
+    sql = _insert_sql(spec)
+    columns = table_columns(spec)
+    with connection, connection.cursor() as cursor:
+        for _, row in df.iterrows():
+            cursor.execute(sql, tuple(row[col] for col in columns))
+    return len(df)
+
+
+def load_executemany(connection, spec, df):
+    with connection, connection.cursor() as cursor:
+        cursor.executemany(_insert_sql(spec), df.itertuples(index=False, name=None))
+    return len(df)
+
+
+def _load_execute_values(page_size):
+    def load(connection, spec, df):
+        with connection, connection.cursor() as cursor:
+            execute_values(cursor, _insert_sql(spec, row_placeholders=False), df.itertuples(index=False, name=None),
+                           page_size=page_size)
+        return len(df)
+    return load
+
+
+def load_copy(connection, spec, df):
+    # one COPY into the partitioned parent
+    with connection, connection.cursor() as cursor:
+        copy_dataframe(cursor, spec["table"], df, table_columns(spec))
+    return len(df)
+
+
+def load_copy_attach(connection, spec, df):
+    # the current default (Bulk_loader.load_table): COPY per year + ATTACH PARTITION
+    rows = 0
+    with connection, connection.cursor() as cursor:
+        for year, year_df in df.groupby("year"):
+            rows += attach_year(cursor, spec, year, year_df)
+    return rows
+
+
+STRATEGIES = {
+    "iterrows": load_iterrows,
+    "executemany": load_executemany,
+    **{f"execute_values_{size}": _load_execute_values(size) for size in EXECUTE_VALUES_PAGE_SIZES},
+    "copy": load_copy,
+    "copy_attach": load_copy_attach,
+    # per-table COPY on one connection per table, see _run
+    "parallel_copy": load_copy_attach,
+}
+PARALLEL = {"parallel_copy"}
+# row-by-row strategies take hours at the larger scales, their rows/sec is
+# measured on the first rows of every table instead
+SLOW = {"iterrows", "executemany"}
+
+
+def _connect():
+    connection = psycopg2.connect(**DB_PARAMS)
+    with connection, connection.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+        cursor.execute(f"SET search_path TO {SCHEMA}")
+    return connection
+
+
+def _prepare(connection, spec, df):
+    # empty partitioned table with its partitions and indexes, like a fresh ingest
+    with connection, connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {spec['table']} CASCADE")
+        cursor.execute(create_table_sql(spec))
+        for statement in index_sql(spec):
+            cursor.execute(statement)
+        for year in df["year"].unique():
+            cursor.execute(partition_sql(spec, year))
+
+
+def _load_one(spec, df, load):
+    connection = _connect()
+    try:
+        return load(connection, spec, df)
+    finally:
+        connection.close()
+
+
+def _run(strategy, scale, slow_rows):
+    # one strategy over every bench table, executed in a fresh process
+    load = STRATEGIES[strategy]
+    frames = {table: scaled_frame(TABLES_BY_NAME[table], scale, rows=slow_rows if strategy in SLOW else None)
+              for table in BENCH_TABLES}
+
+    connection = _connect()
+    try:
+        for table, df in frames.items():
+            _prepare(connection, TABLES_BY_NAME[table], df)
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            if strategy in PARALLEL:
+                with ThreadPoolExecutor(max_workers=len(frames)) as executor:
+                    rows = sum(executor.map(lambda item: _load_one(TABLES_BY_NAME[item[0]], item[1], load),
+                                            frames.items()))
+            else:
+                rows = sum(load(connection, TABLES_BY_NAME[table], df) for table, df in frames.items())
+            elapsed = time.perf_counter() - start
+    finally:
+        connection.close()
+
+    return {
+        "strategy": strategy,
+        "scale": scale,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else float("inf"),
+        # memory the load itself added on top of the prepared frames
+        "load_rss_mb": rss.peak - rss.baseline,
+        "baseline_rss_mb": rss.baseline,
+    }
+
+
+def benchmark(strategies=tuple(STRATEGIES), scales=(1, 100), slow_rows=20_000, keep=False):
+    # the csv files are read relative to the working directory, like the loaders
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for scale in scales:
+        for strategy in strategies:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(_run, strategy, scale, slow_rows).result()
+            results.append(result)
+            print(f"x{scale:<5} {result['rows']:>10} {result['seconds']:9.2f} {result['rows_per_sec']:>12,.0f} "
+                  f"{result['load_rss_mb']:9.1f}  {strategy}")
+    if not keep:
+        connection = psycopg2.connect(**DB_PARAMS)
+        with connection, connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark of the ingestion strategies")
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--slow-rows", type=int, default=20_000,
+                        help="rows per table for the row-by-row strategies")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema")
+    args = parser.parse_args()
+
+    print(f"{'scale':<6} {'rows':>10} {'seconds':>9} {'rows/sec':>12} {'load MB':>9}  strategy")
+    results = benchmark(args.strategies, args.scales, args.slow_rows, args.keep)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
@@ -0,0 +1,53 @@
+import hashlib
+import os
+
+from psycopg2.extras import execute_values
+
+# content-hash manifest of the loaded input files, shared by the csv bulk
+# loader (Ingestion.py) and the json delta loader (Incremental_load.py):
+# a file whose sha256 is already recorded for its table is not loaded again,
+# and byte-identical copies of an input (Aggregated_ins.csv next to
+# Aggregation_ins.csv) are detected before they can double any sums
+
+MANIFEST_SQL = """create table if not exists load_manifest (path TEXT PRIMARY KEY,
+        table_name TEXT,
+        sha256 TEXT,
+        loaded_at TIMESTAMPTZ DEFAULT now())"""
+
+RECORD_SQL = """INSERT INTO load_manifest (path, table_name, sha256) VALUES %s
+    ON CONFLICT (path) DO UPDATE SET table_name = EXCLUDED.table_name, sha256 = EXCLUDED.sha256,
+        loaded_at = now()"""
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def loaded_hashes(cursor):
+    # {path: sha256} of every recorded file
+    cursor.execute(MANIFEST_SQL)
+    cursor.execute("SELECT path, sha256 FROM load_manifest")
+    return dict(cursor.fetchall())
+
+
+def record_loaded(cursor, entries):
+    # entries: (path, table, sha256), in the transaction that loaded them
+    execute_values(cursor, RECORD_SQL, list(entries))
+
+
+def duplicate_files(paths, originals=()):
+    # {original: [byte-identical copies]} of the given files, a path listed in
+    # originals is kept as the original of its group, otherwise the first by name
+    by_hash = {}
+    originals = {os.path.normpath(path) for path in originals}
+    for path in sorted(paths, key=lambda p: (os.path.normpath(p) not in originals, p)):
+        by_hash.setdefault(file_hash(path), []).append(path)
+    return {group[0]: group[1:] for group in by_hash.values() if len(group) > 1}
+
+
+def csv_inputs(directory="."):
+    return [os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".csv")]
@@ -0,0 +1,159 @@
+import pandas as pd
+
+from Profiler import span
+from Query_layer import fetch_frame, paginate_sql, top_n_sql
+from Rollups import rollup_name
+
+# page level query planner of Data_Analysis.py: every analysis page gets its
+# data in two round trips instead of 5-8 sequential queries
+#   1. periods:   year x quater summaries (selectbox options and trend charts)
+#   2. page data: one GROUPING SETS query over the state rollup returning the
+#      totals and state level of the selected quarter, plus (optionally) the
+#      all-time state sums
+# ranked state lists (top / bottom n) are ordered and limited in sql as well;
+# district rows are only read when a state is drilled into (Drilldown.py).
+# Results arrive as typed frames shared through the query cache (Typed_frames.py)
+
+PAGES = {
+    "User Engagement and Growth Strategy": {
+        "table": "map_transaction",
+        "measures": ["transaction_amount", "transaction_count"],
+        "all_time": False,
+    },
+    "Insurance Engagement Analysis": {
+        "table": "map_users",
+        "measures": ["registered_users", "app_opens"],
+        "all_time": True,
+    },
+    "Transaction Analysis Across States and Districts": {
+        "table": "top_transaction",
+        "measures": ["transaction_amount", "transaction_count"],
+        "all_time": False,
+    },
+    "User Registration Analysis": {
+        "table": "top_user",
+        "measures": ["registered_users"],
+        "all_time": False,
+    },
+    "Insurance Transactions Analysis": {
+        "table": "top_insurance",
+        "measures": ["transaction_amount", "transaction_count"],
+        "all_time": False,
+    },
+}
+
+
+def periods_sql(page):
+    plan = PAGES[page]
+    return f"""SELECT year, quater, {', '.join(plan['measures'])}
+        FROM {rollup_name(plan['table'], 'by_quarter')}
+        ORDER BY year, quater"""
+
+
+def page_sql(page):
+    plan = PAGES[page]
+    measures = ", ".join(plan["measures"])
+    sums = ", ".join(f"SUM({col})::BIGINT AS {col}" for col in plan["measures"])
+    # aggregated on the state ids, names are joined onto the result rows
+    sql = f"""SELECT CASE GROUPING(state_id) WHEN 1 THEN 'total' ELSE 'state' END AS level,
+            state_id, {sums}
+        FROM {rollup_name(plan['table'], 'by_state')}
+        WHERE year = %s AND quater = %s
+        GROUP BY GROUPING SETS ((), (state_id))"""
+    if plan["all_time"]:
+        sql += f"""
+            UNION ALL
+            SELECT 'all_time', state_id, {sums}
+            FROM {rollup_name(plan['table'], 'by_state')}
+            GROUP BY state_id"""
+    return f"""SELECT page.level, s.display_name AS state, s.geojson_key AS geo_key, {measures}
+        FROM ({sql}) AS page LEFT JOIN dim_state s ON s.id = page.state_id"""
+
+
+def states_sql(page, per_quarter=True):
+    # state level of the page's measures by display name, for one quarter
+    # (year, quater params) or summed over all time
+    plan = PAGES[page]
+    source = rollup_name(plan["table"], "by_state")
+    measures = ", ".join(f"r.{col}" for col in plan["measures"])
+    if per_quarter:
+        rows = f"SELECT * FROM {source} WHERE year = %s AND quater = %s"
+    else:
+        sums = ", ".join(f"SUM({col})::BIGINT AS {col}" for col in plan["measures"])
+        rows = f"SELECT state_id, {sums} FROM {source} GROUP BY state_id"
+    return f"SELECT s.display_name AS state, {measures} FROM ({rows}) AS r JOIN dim_state s ON s.id = r.state_id"
+
+
+def load_periods(page):
+    # year x quater frame with the quarter totals of the page's measures
+    return fetch_frame(periods_sql(page))
+
+
+def period_options(periods):
+    # distinct years and quarters for the selectboxes, as plain ints
+    return sorted(int(y) for y in periods["year"].unique()), sorted(int(q) for q in periods["quater"].unique())
+
+
+def load_page(page, year, quarter):
+    # {"totals": {measure: value}, "states": df, "all_time": df},
+    # state is the display name, geo_key the GeoJSON key of the choropleths
+    df = fetch_frame(page_sql(page), (year, quarter))
+    with span("frame", "page data"):
+        return _split_levels(df, PAGES[page]["measures"])
+
+
+def _split_levels(df, measures):
+    # the level-labelled GROUPING SETS rows split into the page frames
+    total = df[df["level"] == "total"]
+    totals = {col: (total[col].iloc[0] if len(total) and pd.notna(total[col].iloc[0]) else 0)
+              for col in measures}
+
+    def level(name, keys):
+        columns = keys + measures
+        return df.loc[df["level"] == name, columns].sort_values(keys).reset_index(drop=True)
+
+    return {
+        "totals": totals,
+        "states": level("state", ["state", "geo_key"]),
+        "all_time": level("all_time", ["state", "geo_key"]),
+    }
+
+
+def _states_params(year, quarter):
+    return (year, quarter) if year is not None else None
+
+
+def top_states_sql(page, measure, n, per_quarter=True, bottom=False, other=False):
+    measures = [measure] + [col for col in PAGES[page]["measures"] if col != measure]
+    source = states_sql(page, per_quarter)
+    if other:
+        return top_n_sql(source, "state", measures, n)
+    return paginate_sql(source, f"{measure} {'ASC' if bottom else 'DESC'}, state", n)
+
+
+def top_bottom_sql(page, measure, n, per_quarter=True):
+    # takes the (year, quater) params twice when per_quarter
+    source = states_sql(page, per_quarter)
+    top = paginate_sql(source, f"{measure} DESC, state", n)
+    bottom = paginate_sql(source, f"{measure} ASC, state", n)
+    return f"SELECT 'top' AS side, * FROM ({top}) AS top UNION ALL SELECT 'bottom', * FROM ({bottom}) AS bottom"
+
+
+def load_top_states(page, measure, n, year=None, quarter=None, bottom=False, other=False):
+    # n states with the highest (lowest with bottom=True) measure of the
+    # quarter, or of all time when year is None; other=True adds one "Other"
+    # row with the sum of the remaining states
+    sql = top_states_sql(page, measure, n, year is not None, bottom, other)
+    return fetch_frame(sql, _states_params(year, quarter))[["state"] + PAGES[page]["measures"]]
+
+
+def load_top_bottom(page, measure, n, year=None, quarter=None):
+    # top and bottom n states in one query, highest and lowest first
+    params = _states_params(year, quarter)
+    df = fetch_frame(top_bottom_sql(page, measure, n, year is not None), params * 2 if params else None)
+
+    def side(name, ascending):
+        rows = df[df["side"] == name].drop(columns="side")
+        return rows.sort_values(measure, ascending=ascending, kind="stable").reset_index(drop=True)
+
+    return side("top", False), side("bottom", True)
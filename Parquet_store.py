@@ -0,0 +1,40 @@
+import os
+import shutil
+
+from Bulk_loader import read_pulse_csv
+from Pulse_tables import TABLES, TABLES_BY_NAME
+
+# conversion of the pulse csv files into Parquet datasets partitioned by
+# year / quarter (hive layout: parquet/<table>/year=2023/quater=4/...),
+# read by the DuckDB backend (Duckdb_backend.py)
+
+PARQUET_DIR = os.environ.get("PULSE_PARQUET_DIR",
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), "parquet"))
+
+
+def table_path(table, parquet_dir=PARQUET_DIR):
+    return os.path.join(parquet_dir, table)
+
+
+def write_table(spec, parquet_dir=PARQUET_DIR):
+    # rewrites the whole dataset of one table, returns the row count
+    df = read_pulse_csv(spec)
+    path = table_path(spec["table"], parquet_dir)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    df.to_parquet(path, partition_cols=["year", "quater"], index=False)
+    return len(df)
+
+
+def convert_all(table_names=None, parquet_dir=PARQUET_DIR):
+    specs = [TABLES_BY_NAME[name] for name in table_names] if table_names else TABLES
+    stats = {}
+    for spec in specs:
+        stats[spec["table"]] = write_table(spec, parquet_dir)
+        print(f"{spec['table']}: {stats[spec['table']]} rows -> {table_path(spec['table'], parquet_dir)}")
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+    convert_all(sys.argv[1:] or None)
@@ -0,0 +1,68 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# background prefetch of the year / quarter selections a user is likely to
+# pick next: once a page has rendered (year, q), the previous and next quarter
+# and the same quarter of the previous year are loaded in a small thread pool.
+# The loaders go through the query cache (Query_layer.py), so the next rerun
+# finds its results there instead of waiting on the database.
+
+PREFETCH_WORKERS = int(os.environ.get("PULSE_PREFETCH_WORKERS", 2))
+
+_executor = None
+_executor_lock = threading.Lock()
+# loads submitted and not finished yet, the same selection is not queued twice
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="pulse-prefetch")
+    return _executor
+
+
+def neighbours(periods, year, quarter):
+    # previous / next quarter and the same quarter a year earlier, limited to
+    # the (year, quater) pairs present in the periods frame
+    available = set(zip(periods["year"].astype(int), periods["quater"].astype(int)))
+    candidates = [
+        (year, quarter - 1) if quarter > 1 else (year - 1, 4),
+        (year, quarter + 1) if quarter < 4 else (year + 1, 1),
+        (year - 1, quarter),
+    ]
+    return [period for period in candidates if period in available]
+
+
+def _run(key, load, args, kwargs):
+    try:
+        load(*args, **kwargs)
+    except Exception as exc:
+        # a failed prefetch only means the next rerun queries the database
+        print(f"prefetch of {load.__name__}{args} failed: {exc}")
+    finally:
+        with _pending_lock:
+            _pending.discard(key)
+
+
+def schedule(load, *args, **kwargs):
+    # runs load(*args, **kwargs) in the background unless it is already queued
+    if PREFETCH_WORKERS <= 0:
+        return False
+    key = (load.__module__, load.__qualname__, args, tuple(sorted(kwargs.items())))
+    with _pending_lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+    _get_executor().submit(_run, key, load, args, kwargs)
+    return True
+
+
+def prefetch_quarters(periods, year, quarter, load, *args, **kwargs):
+    # load(*args, year, quarter, **kwargs) for every neighbouring selection
+    return [period for period in neighbours(periods, year, quarter)
+            if schedule(load, *args, *period, **kwargs)]
@@ -0,0 +1,146 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+# opt-in timing spans for the dashboard hot path: db calls (Query_layer.py),
+# frame construction (Page_queries.py), figure building and chart rendering
+# (Data_Analysis.py). A span is only recorded while a run is active, i.e.
+# between start_run() and finish_run() of a profiled rerun, so the
+# instrumentation costs one ContextVar lookup when profiling is off.
+# Finished runs are appended as json lines to PULSE_PROFILE_LOG and summed
+# into process-wide counters, readable in the Prometheus text format.
+
+ENABLED = os.environ.get("PULSE_PROFILE", "0") == "1"
+LOG_PATH = os.environ.get("PULSE_PROFILE_LOG")
+PROMETHEUS_PATH = os.environ.get("PULSE_PROFILE_PROM")
+
+_run = contextvars.ContextVar("pulse_profile_run", default=None)
+
+# (kind, name) -> [count, seconds], over every run of this process
+_totals = defaultdict(lambda: [0, 0.0])
+_totals_lock = threading.Lock()
+
+
+def start_run(page, enabled=True):
+    # starts collecting the spans of this rerun, enabled=False drops any
+    # run left over from a rerun that raised
+    if not enabled:
+        _run.set(None)
+        return
+    _run.set({"run": uuid.uuid4().hex[:12], "page": page, "started": time.time(),
+              "start": time.perf_counter(), "spans": []})
+
+
+def set_page(page):
+    # relabels the run once the analysis page is known, its spans are kept
+    run = _run.get()
+    if run is not None:
+        run["page"] = page
+
+
+def active():
+    return _run.get() is not None
+
+
+@contextmanager
+def span(kind, name):
+    run = _run.get()
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # list.append is atomic, spans of worker threads can share the run
+        run["spans"].append({"kind": kind, "name": name,
+                             "offset_ms": (start - run["start"]) * 1000,
+                             "ms": (time.perf_counter() - start) * 1000})
+
+
+def timed(kind, name=None):
+    # decorator form of span()
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run.get() is None:
+                return func(*args, **kwargs)
+            with span(kind, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class timed_module:
+    # proxy timing every call to the module's functions, e.g.
+    # px = timed_module(px, "figure") records px.choropleth as figure/choropleth
+
+    def __init__(self, module, kind, names=None):
+        self._module = module
+        self._kind = kind
+        self._names = names
+
+    def __getattr__(self, attr):
+        value = getattr(self._module, attr)
+        if callable(value) and (self._names is None or attr in self._names):
+            return timed(self._kind, attr)(value)
+        return value
+
+
+def finish_run():
+    # stops the run, exports it and returns it (None when nothing was running)
+    run = _run.get()
+    if run is None:
+        return None
+    _run.set(None)
+    run["total_ms"] = (time.perf_counter() - run.pop("start")) * 1000
+    with _totals_lock:
+        for s in run["spans"]:
+            total = _totals[(s["kind"], s["name"])]
+            total[0] += 1
+            total[1] += s["ms"] / 1000
+    if LOG_PATH:
+        with open(LOG_PATH, "a", encoding="utf-8") as fh:
+            for s in run["spans"]:
+                fh.write(json.dumps({"run": run["run"], "page": run["page"], "ts": run["started"], **s}) + "\n")
+    if PROMETHEUS_PATH:
+        # textfile collector format, rewritten after every run
+        with open(PROMETHEUS_PATH, "w", encoding="utf-8") as fh:
+            fh.write(prometheus_text())
+    return run
+
+
+def prometheus_text():
+    with _totals_lock:
+        items = sorted(_totals.items())
+    lines = []
+    for metric, index, fmt in (("pulse_span_seconds_total", 1, "{:.6f}"), ("pulse_span_count_total", 0, "{}")):
+        lines.append(f"# TYPE {metric} counter")
+        for (kind, name), total in items:
+            lines.append(f'{metric}{{kind="{kind}",name="{name}"}} ' + fmt.format(total[index]))
+    return "\n".join(lines) + "\n"
+
+
+def render_panel(run, container=None):
+    # per-rerun breakdown in the streamlit sidebar
+    import pandas as pd
+    import streamlit as st
+
+    container = container or st.sidebar
+    with container.expander(f"⏱ Profile: {run['total_ms']:.0f} ms", expanded=True):
+        if not run["spans"]:
+            st.write("no spans recorded")
+            return
+        df = pd.DataFrame(run["spans"])
+        by_kind = df.groupby("kind")["ms"].agg(["count", "sum"]).sort_values("sum", ascending=False)
+        st.dataframe(by_kind.round(1))
+        st.dataframe(df[["kind", "name", "ms"]].sort_values("ms", ascending=False).round(1),
+                     hide_index=True)
@@ -0,0 +1,129 @@
+# table registry of the pulse datasets: csv file -> table name, column mapping,
+# sql types and natural primary key (state_id, year, quater, area).
+# The csv "State" slug is stored as the SMALLINT id of dim_state (Dim_state.py)
+
+KEY_COLUMNS = ["state_id", "year", "quater"]
+
+
+def _table(csv, table, area, columns):
+    return {
+        "csv": csv,
+        "table": table,
+        # third key column: district / pincode / transaction type / brand
+        "area": area,
+        # (csv column, table column, sql type)
+        "columns": columns,
+        "primary_key": KEY_COLUMNS + [area],
+    }
+
+
+_AREA_AMOUNTS = [
+    ("State", "state_id", "SMALLINT"),
+    ("Year", "year", "INT"),
+    ("Quater", "quater", "INT"),
+    ("Transaction_area", "transaction_area", "TEXT"),
+    ("Transaction_count", "transaction_count", "BIGINT"),
+    ("Transaction_amount", "transaction_amount", "BIGINT"),
+]
+
+TABLES = [
+    _table("Map_transaction.csv", "map_transaction", "transaction_area", _AREA_AMOUNTS),
+
+    _table("Map_User.csv", "map_users", "transaction_area", [
+        ("State", "state_id", "SMALLINT"),
+        ("Year", "year", "INT"),
+        ("Quater", "quater", "INT"),
+        ("Transaction_area", "transaction_area", "TEXT"),
+        ("Registered_Users", "registered_users", "BIGINT"),
+        ("App_opens", "app_opens", "BIGINT"),
+    ]),
+
+    _table("Map_Ins_hover.csv", "map_insurance", "transaction_area", _AREA_AMOUNTS),
+
+    _table("Top_transaction.csv", "top_transaction", "transaction_area", _AREA_AMOUNTS),
+
+    _table("Top_User.csv", "top_user", "transaction_area", [
+        ("State", "state_id", "SMALLINT"),
+        ("Year", "year", "INT"),
+        ("Quater", "quater", "INT"),
+        ("Transaction_area", "transaction_area", "TEXT"),
+        ("Registered_Users", "registered_users", "BIGINT"),
+    ]),
+
+    _table("Top_Insurance.csv", "top_insurance", "transaction_area", _AREA_AMOUNTS),
+
+    # Aggregated_ins.csv is a byte-identical copy of Aggregation_ins.csv
+    _table("Aggregation_ins.csv", "aggregation_ins", "transacion_type", [
+        ("State", "state_id", "SMALLINT"),
+        ("Year", "year", "INT"),
+        ("Quater", "quater", "INT"),
+        ("Transacion_type", "transacion_type", "TEXT"),
+        ("Transacion_count", "transacion_count", "BIGINT"),
+        ("Transacion_amount", "transacion_amount", "BIGINT"),
+    ]),
+
+    _table("Aggregation_trx.csv", "aggregation_trx", "transacion_type", [
+        ("State", "state_id", "SMALLINT"),
+        ("Year", "year", "INT"),
+        ("Quater", "quater", "INT"),
+        ("Transacion_type", "transacion_type", "TEXT"),
+        ("Transacion_count", "transacion_count", "BIGINT"),
+        ("Transacion_amount", "transacion_amount", "NUMERIC(30,0)"),
+    ]),
+
+    _table("Aggregation_user.csv", "aggregation_user", "brand", [
+        ("State", "state_id", "SMALLINT"),
+        ("Year", "year", "INT"),
+        ("Quater", "quater", "INT"),
+        ("Brand", "brand", "TEXT"),
+        ("User_count", "user_count", "BIGINT"),
+        ("User_percentage", "user_percentage", "FLOAT"),
+    ]),
+]
+
+TABLES_BY_NAME = {spec["table"]: spec for spec in TABLES}
+
+
+def csv_columns(spec):
+    return [csv_col for csv_col, _, _ in spec["columns"]]
+
+
+def table_columns(spec):
+    return [col for _, col, _ in spec["columns"]]
+
+
+def measure_columns(spec):
+    return [col for col in table_columns(spec) if col not in spec["primary_key"]]
+
+
+def integer_columns(spec):
+    # columns whose csv values have to be rounded before COPY
+    return [col for _, col, sql_type in spec["columns"]
+            if sql_type in ("INT", "BIGINT") or sql_type.endswith(",0)")]
+
+
+def create_table_sql(spec):
+    # fact tables are list-partitioned by year, one partition per year
+    column_defs = ",\n        ".join(f"{col} {sql_type}" for _, col, sql_type in spec["columns"])
+    return f"""create table if not exists {spec['table']} ({column_defs},
+        primary key ({', '.join(spec['primary_key'])}))
+        partition by list (year)"""
+
+
+def index_sql(spec):
+    # composite indexes for the year/quarter filters and the state drill-down,
+    # declared on the parent so every partition gets them
+    table = spec["table"]
+    return [
+        f"create index if not exists {table}_year_quater_state on {table} (year, quater, state_id)",
+        f"create index if not exists {table}_state_area on {table} (state_id, {spec['area']})",
+    ]
+
+
+def partition_name(spec, year):
+    return f"{spec['table']}_{int(year)}"
+
+
+def partition_sql(spec, year):
+    return f"""create table if not exists {partition_name(spec, year)}
+        partition of {spec['table']} for values in ({int(year)})"""
@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+import statistics
+import time
+
+import psycopg2
+
+from Cube import CUBE_PAGES
+from Db_config import DB_PARAMS
+from Drilldown import DRILLDOWN_TABLES, districts_sql
+from Drilldown import states_sql as drilldown_states_sql
+from Export import export_sql
+from Page_queries import PAGES, page_sql, periods_sql, top_bottom_sql, top_states_sql
+from Pulse_tables import TABLES_BY_NAME, create_table_sql, index_sql, measure_columns, partition_sql, table_columns
+from Rollups import build_rollups
+from Typed_frames import fact_sql, state_rollup_sql
+
+# benchmark of every query the dashboard issues (Page_queries.py for the five
+# analysis pages, the drill-down, trend, cube and export queries) against the
+# csv-loaded tables and against synthetic copies
+# scaled 10x / 100x / 1000x, built server-side from the loaded rows:
+#   more quarters: the years are repeated further back in time
+#   more districts / pincodes: every area is repeated with a suffix
+#   measures: the original values with +-15% noise, so distributions stay close
+# reports p50 / p95 latency, rows scanned and the plan shape of each query
+
+FACT_TABLES = sorted({plan["table"] for plan in PAGES.values()} | set(DRILLDOWN_TABLES) | set(CUBE_PAGES.values()))
+
+# the ranked state lists of Data_Analysis.py: (page, kind, measure, n, per quarter, options)
+TOP_QUERIES = [
+    ("Insurance Engagement Analysis", "top_bottom", "registered_users", 10, False, {}),
+    ("Transaction Analysis Across States and Districts", "top_states", "transaction_count", 12, False,
+     {"bottom": True}),
+    ("Transaction Analysis Across States and Districts", "top_bottom", "transaction_amount", 5, False, {}),
+    ("User Registration Analysis", "top_states", "registered_users", 15, True, {"other": True}),
+    ("Insurance Transactions Analysis", "top_bottom", "transaction_count", 5, False, {}),
+]
+
+
+def statements(cursor):
+    # (name, sql, params) of every dashboard query, for the latest quarter
+    cursor.execute("SELECT max(year) FROM map_transaction")
+    year = cursor.fetchone()[0]
+    cursor.execute("SELECT max(quater) FROM map_transaction WHERE year = %s", (year,))
+    quarter = cursor.fetchone()[0]
+    for page in PAGES:
+        yield f"{page} / periods", periods_sql(page), None
+        yield f"{page} / page data", page_sql(page), (year, quarter)
+    for page, kind, measure, n, per_quarter, options in TOP_QUERIES:
+        params = (year, quarter) if per_quarter else None
+        if kind == "top_bottom":
+            sql, params = top_bottom_sql(page, measure, n, per_quarter), params * 2 if params else None
+        else:
+            sql = top_states_sql(page, measure, n, per_quarter, **options)
+        yield f"{page} / {kind} {measure} {n}", sql, params
+    for table in DRILLDOWN_TABLES:
+        # the state with the most rows is the slowest one to drill into
+        cursor.execute(f"""SELECT state_id FROM {table} WHERE year = %s AND quater = %s
+            GROUP BY state_id ORDER BY count(*) DESC LIMIT 1""", (year, quarter))
+        state_id = cursor.fetchone()[0]
+        yield f"drill-down {table} / states", drilldown_states_sql(table), (year, quarter)
+        yield f"drill-down {table} / districts", districts_sql(table), (year, quarter, state_id)
+    for table in sorted({plan["table"] for plan in PAGES.values()}):
+        yield f"trends {table} / state rollup", state_rollup_sql(table), None
+    for table in CUBE_PAGES.values():
+        yield f"cube {table} / fact rows", fact_sql(table), None
+    yield "export map_transaction / quarter", export_sql("map_transaction"), (year, quarter)
+
+
+def scale_split(scale):
+    # 10 -> 2 year copies x 5 area copies, 100 -> 5 x 20, 1000 -> 10 x 100
+    year_copies = max(1, round(scale ** (1 / 3)))
+    return year_copies, math.ceil(scale / year_copies)
+
+
+def build_scaled(connection, scale):
+    # creates schema bench_x<scale> with scaled copies of the fact tables
+    schema = f"bench_x{scale}"
+    year_copies, area_copies = scale_split(scale)
+    with connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {schema}")
+            cursor.execute(f"SET search_path TO {schema}")
+            for table in FACT_TABLES:
+                spec = TABLES_BY_NAME[table]
+                cursor.execute(f"SELECT min(year), max(year) FROM public.{table}")
+                first, last = cursor.fetchone()
+                span = last - first + 1
+                cursor.execute(create_table_sql(spec))
+                for statement in index_sql(spec):
+                    cursor.execute(statement)
+                for year in range(first - span * (year_copies - 1), last + 1):
+                    cursor.execute(partition_sql(spec, year))
+                columns = table_columns(spec)
+                sql_types = {col: sql_type for _, col, sql_type in spec["columns"]}
+                select = []
+                for col in columns:
+                    if col == "year":
+                        select.append(f"year - k * {span}")
+                    elif col == spec["area"]:
+                        select.append(f"CASE WHEN i = 0 THEN {col} ELSE {col} || ' ' || i END")
+                    elif col in measure_columns(spec) and sql_types[col] == "FLOAT":
+                        select.append(f"{col} * (0.85 + 0.3 * random())")
+                    elif col in measure_columns(spec):
+                        select.append(f"({col} * (0.85 + 0.3 * random()))::BIGINT")
+                    else:
+                        select.append(col)
+                cursor.execute(f"""INSERT INTO {table} ({', '.join(columns)})
+                    SELECT {', '.join(select)} FROM public.{table},
+                        generate_series(0, {year_copies - 1}) AS k, generate_series(0, {area_copies - 1}) AS i""")
+                cursor.execute(f"ANALYZE {table}")
+    # search_path still points at the schema, the rollups are built there
+    build_rollups(connection, FACT_TABLES, concurrently=False)
+    return schema
+
+
+def _plan_summary(node):
+    # compact plan shape and the rows read by scan nodes
+    scanned = 0
+    if "Scan" in node["Node Type"]:
+        scanned += node.get("Actual Rows", 0) * node.get("Actual Loops", 1) + node.get("Rows Removed by Filter", 0)
+    shape = [node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "")]
+    for child in node.get("Plans", []):
+        child_shape, child_scanned = _plan_summary(child)
+        shape.append(child_shape)
+        scanned += child_scanned
+    return (shape[0] if len(shape) == 1 else f"{shape[0]}({', '.join(shape[1:])})"), scanned
+
+
+def run_statement(cursor, sql, params, repeat):
+    cursor.execute(sql, params)
+    cursor.fetchall()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+    plan = cursor.fetchone()[0]
+    plan = plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+    shape, scanned = _plan_summary(plan["Plan"])
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, math.ceil(0.95 * len(timings)) - 1)],
+        "rows_scanned": scanned,
+        "plan": shape,
+    }
+
+
+def benchmark(scales=(1, 10, 100, 1000), repeat=20, keep=False):
+    connection = psycopg2.connect(**DB_PARAMS)
+    results = []
+    try:
+        for scale in scales:
+            schema = "public" if scale == 1 else build_scaled(connection, scale)
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                # dim_state is shared with the csv-loaded tables in public
+                cursor.execute(f"SET search_path TO {schema}, public")
+                for name, sql, params in list(statements(cursor)):
+                    result = run_statement(cursor, sql, params, repeat)
+                    result.update(scale=scale, query=name)
+                    results.append(result)
+                    print(f"x{scale:<5} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                          f"{result['rows_scanned']:>10}  {name}")
+                if schema != "public" and not keep:
+                    cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+            connection.autocommit = False
+    finally:
+        connection.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark of the dashboard queries")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the bench_x<scale> schemas")
+    args = parser.parse_args()
+
+    print(f"{'scale':<6} {'p50 ms':>8} {'p95 ms':>8} {'scanned':>10}  query")
+    results = benchmark(args.scales, args.repeat, args.keep)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
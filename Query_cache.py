@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# memoizing cache of query results keyed on (sql, params) with LRU eviction
+# and a TTL. Every entry is tagged with the tables its sql reads so that a
+# load can invalidate just those tables. Loads running in another process
+# (Database_connection.py, Incremental_load.py) bump a per-table version in
+# table_versions, which the dashboard polls every VERSION_CHECK_SECONDS.
+
+CACHE_SIZE = int(os.environ.get("PULSE_CACHE_SIZE", 512))
+CACHE_TTL = float(os.environ.get("PULSE_CACHE_TTL", 3600))
+VERSION_CHECK_SECONDS = float(os.environ.get("PULSE_VERSION_CHECK_SECONDS", 30))
+
+TABLE_VERSIONS_SQL = """create table if not exists table_versions (table_name TEXT PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 1,
+        loaded_at TIMESTAMPTZ DEFAULT now())"""
+
+_TABLE_PATTERN = re.compile(r"\b(?:from|join)\s+([a-z_][a-z0-9_]*)", re.IGNORECASE)
+
+
+def tables_in(query):
+    return frozenset(name.lower() for name in _TABLE_PATTERN.findall(query))
+
+
+class QueryCache:
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tables, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # bumped on every invalidation, see data_version()
+        self._generation = 0
+        self._table_generations = {}
+
+    def get(self, key):
+        # (True, value) on a fresh hit, (False, None) otherwise
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, tables, value, generation=None):
+        # with a generation (see generation()), the value is dropped instead
+        # if one of its tables was invalidated since that generation was taken
+        with self._lock:
+            if generation is not None and generation != self._generation_of(sorted(tables)):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, tables, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables=None):
+        # drops the entries reading any of the tables, everything when None
+        with self._lock:
+            if tables is None:
+                self._entries.clear()
+                self._generation += 1
+                return
+            tables = {table.lower() for table in tables}
+            for table in tables:
+                self._table_generations[table] = self._table_generations.get(table, 0) + 1
+            for key in [k for k, entry in self._entries.items() if entry[1] & tables]:
+                del self._entries[key]
+
+    def _generation_of(self, tables):
+        return (self._generation,) + tuple(self._table_generations.get(t.lower(), 0) for t in tables)
+
+    def generation(self, tables):
+        with self._lock:
+            return self._generation_of(tables)
+
+    def cached(self, query, params, compute):
+        key = (query, tuple(params) if params is not None else None)
+        hit, value = self.get(key)
+        if hit:
+            return value
+        tables = tables_in(query)
+        # compute() runs unlocked, a table invalidated meanwhile may have been
+        # read before its reload: return that result but do not keep it
+        before = self.generation(sorted(tables))
+        value = compute()
+        self.put(key, tables, value, before)
+        return value
+
+
+query_cache = QueryCache()
+
+_versions = None
+_versions_checked_at = 0.0
+_versions_lock = threading.Lock()
+
+
+def check_versions(fetch_versions):
+    # invalidates tables whose version changed since the last poll;
+    # fetch_versions returns [(table_name, version), ...]
+    global _versions, _versions_checked_at
+    with _versions_lock:
+        if time.monotonic() - _versions_checked_at < VERSION_CHECK_SECONDS:
+            return
+        _versions_checked_at = time.monotonic()
+        current = dict(fetch_versions())
+        changed = []
+        if _versions is not None:
+            changed = [table for table, version in current.items() if _versions.get(table) != version]
+        _versions = current
+    if changed:
+        query_cache.invalidate(changed)
+
+
+def polled_versions(tables):
+    # table_versions of the tables as of the last poll, None where unknown
+    # (DuckDB backend, table_versions missing or not polled yet)
+    return tuple((_versions or {}).get(table) for table in sorted(tables))
+
+
+def data_version(tables):
+    # changes whenever one of the tables is reloaded, in this process or
+    # (after the next poll) in another one; used to key derived caches
+    return query_cache.generation(sorted(tables)) + polled_versions(tables)
+
+
+def mark_loaded(cursor, tables):
+    # called by the loaders after a load, in the loading transaction
+    cursor.execute(TABLE_VERSIONS_SQL)
+    for table in tables:
+        cursor.execute("""INSERT INTO table_versions (table_name) VALUES (%s)
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = table_versions.version + 1, loaded_at = now()""", (table,))
+    query_cache.invalidate(tables)
@@ -0,0 +1,172 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from Db_config import DB_PARAMS
+from Profiler import span
+from Query_cache import check_versions, query_cache, tables_in
+
+# data access layer of the dashboard: one thread-safe connection pool per
+# process, a cursor per query and a statement timeout on every connection.
+# Streamlit re-executes Data_Analysis.py on each interaction but keeps imported
+# modules, so the pool below survives reruns and is shared by all sessions.
+
+# "postgres" (default) or "duckdb" for the embedded Parquet backend (Duckdb_backend.py)
+BACKEND = os.environ.get("PULSE_BACKEND", "postgres")
+# psycopg2 closes returned connections above POOL_MIN, it is sized for a page's
+# concurrent queries (Query_layer.submit) plus the prefetch threads
+POOL_MIN = int(os.environ.get("PULSE_POOL_MIN", 4))
+POOL_MAX = int(os.environ.get("PULSE_POOL_MAX", 10))
+STATEMENT_TIMEOUT_MS = int(os.environ.get("PULSE_STATEMENT_TIMEOUT_MS", 5000))
+
+_pool = None
+_pool_lock = threading.Lock()
+_executor = None
+# ThreadedConnectionPool raises when it is exhausted, the semaphore makes
+# callers wait for a free connection instead
+_slots = threading.BoundedSemaphore(POOL_MAX)
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(POOL_MIN, POOL_MAX,
+                                               options=f"-c statement_timeout={STATEMENT_TIMEOUT_MS}",
+                                               **DB_PARAMS)
+    return _pool
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=POOL_MAX, thread_name_prefix="pulse-query")
+    return _executor
+
+
+def submit(load, *args, **kwargs):
+    # runs a loader (e.g. Page_queries.load_page) on the query thread pool and
+    # returns its Future, so a page can start all its independent queries at
+    # once and render each section when its result is ready; the caller's
+    # context (the Profiler run) goes along
+    context = contextvars.copy_context()
+    return _get_executor().submit(context.run, load, *args, **kwargs)
+
+
+@contextmanager
+def get_connection():
+    pool = get_pool()
+    with _slots:
+        connection = pool.getconn()
+        try:
+            yield connection
+        finally:
+            # broken connections are closed instead of going back to the pool
+            pool.putconn(connection, close=bool(connection.closed))
+
+
+@contextmanager
+def get_cursor():
+    with get_connection() as connection:
+        # dashboard queries are read-only, autocommit avoids idle transactions
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            yield cursor
+
+
+def _execute(query, params, fetch):
+    # fetch: "all" / "one" rows or a typed "frame" (Typed_frames.py);
+    # timed as a "db" span named after the tables read, see Profiler.py
+    with span("db", ",".join(sorted(tables_in(query)))):
+        if BACKEND == "duckdb":
+            from Duckdb_backend import execute
+            result = execute(query, params, fetch)
+            if fetch == "frame":
+                from Typed_frames import typed
+                result = typed(result)
+            return result
+        with get_cursor() as cursor:
+            if fetch == "frame":
+                from Typed_frames import copy_frame
+                return copy_frame(cursor, query, params)
+            cursor.execute(query, params)
+            return cursor.fetchall() if fetch == "all" else cursor.fetchone()
+
+
+def _table_versions():
+    # the parquet files only change on redeploy, there is nothing to poll
+    if BACKEND == "duckdb":
+        return []
+    try:
+        return _execute("SELECT table_name, version FROM table_versions", None, "all")
+    except psycopg2.errors.UndefinedTable:
+        return []
+
+
+def _fetch(query, params, fetch, cached):
+    # results are served from the query cache unless cached=False
+    if not cached:
+        return _execute(query, params, fetch)
+    check_versions(_table_versions)
+    return query_cache.cached(query, (fetch,) + tuple(params or ()),
+                              lambda: _execute(query, params, fetch))
+
+
+def fetch_all(query, params=None, cached=True):
+    return _fetch(query, params, "all", cached)
+
+
+def fetch_one(query, params=None, cached=True):
+    return _fetch(query, params, "one", cached)
+
+
+def fetch_frame(query, params=None, cached=True):
+    # typed DataFrame of the result, shared through the cache: do not modify
+    # it in place
+    return _fetch(query, params, "frame", cached)
+
+
+def fetch_column(query, params=None, cached=True):
+    # first column of every row, e.g. the DISTINCT year / quater lists
+    return [row[0] for row in fetch_all(query, params, cached)]
+
+
+# ---------- pagination and top-n, pushed down into sql ----------
+
+def paginate_sql(query, order_by, limit, offset=0):
+    # one page of any select, e.g. the pincode rows of a state
+    return f"SELECT * FROM ({query}) AS paged ORDER BY {order_by} LIMIT {int(limit)} OFFSET {int(offset)}"
+
+
+def top_n_sql(query, label, measures, n, partition=(), other="Other"):
+    # keeps the n largest rows (by the first measure) of every partition and
+    # sums the rest into one `other` row, which comes last in its partition;
+    # columns: partition..., label, measures...
+    keys = list(partition)
+    over = f"PARTITION BY {', '.join(keys)} " if keys else ""
+    bucket = f"CASE WHEN row_rank <= {int(n)} THEN {label} ELSE '{other}' END"
+    sums = ", ".join(f"SUM({col})::BIGINT AS {col}" for col in measures)
+    group_by = ", ".join(str(i) for i in range(1, len(keys) + 2))
+    return f"""WITH ranked AS (
+            SELECT *, ROW_NUMBER() OVER ({over}ORDER BY {measures[0]} DESC NULLS LAST) AS row_rank
+            FROM ({query}) AS source)
+        SELECT {''.join(key + ', ' for key in keys)}{bucket} AS {label}, {sums}
+        FROM ranked
+        GROUP BY {group_by}
+        ORDER BY {''.join(key + ', ' for key in keys)}MIN(row_rank)"""
+
+
+def fetch_paginated(query, params, order_by, limit, offset=0, cached=True):
+    return fetch_all(paginate_sql(query, order_by, limit, offset), params, cached)
+
+
+def fetch_top_n(query, params, label, measures, n, partition=(), other="Other", cached=True):
+    return fetch_all(top_n_sql(query, label, measures, n, partition, other), params, cached)
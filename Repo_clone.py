@@ -1,10 +1,23 @@
-# cloning the phonepe pulse repository
-import git
+# cloning the phonepe pulse repository, or pulling only the new commits
+# into an existing clone (used by Incremental_load.py for quarterly refreshes)
+import os
+
+from git import Repo
+
 repo_url = "https://github.com/PhonePe/pulse.git"
 
-destination = "E:\GUVI - DS\Phonepe_pulse\data"
+destination = r"E:\GUVI - DS\Phonepe_pulse\data"
 
-from git import Repo
 
-Repo.clone_from(repo_url, destination)
+def update_repo(destination=destination):
+    # returns (repo, commit before the pull), the commit is None for a fresh clone
+    if os.path.isdir(os.path.join(destination, ".git")):
+        repo = Repo(destination)
+        previous = repo.head.commit.hexsha
+        repo.remotes.origin.pull()
+        return repo, previous
+    return Repo.clone_from(repo_url, destination), None
+
 
+if __name__ == "__main__":
+    update_repo()
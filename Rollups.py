@@ -0,0 +1,59 @@
+from Pulse_tables import TABLES, TABLES_BY_NAME
+from Query_cache import mark_loaded
+
+# pre-aggregated rollups of every fact table, kept as materialized views:
+#   <table>_by_state    state_id x year x quater
+#   <table>_by_quarter  year x quater
+#   <table>_by_year     year
+# the dashboard reads its state / quarter / year summaries from these instead
+# of aggregating the district and pincode rows on every request
+
+ROLLUPS = {
+    "by_state": ["state_id", "year", "quater"],
+    "by_quarter": ["year", "quater"],
+    "by_year": ["year"],
+}
+
+
+def rollup_name(table, level):
+    return f"{table}_{level}"
+
+
+def summed_columns(spec):
+    # counts and amounts add up, percentages (aggregation_user) do not
+    return [col for _, col, sql_type in spec["columns"]
+            if col not in spec["primary_key"] and sql_type != "FLOAT"]
+
+
+def rollup_sql(spec, level):
+    keys = ", ".join(ROLLUPS[level])
+    sums = ", ".join(f"SUM({col})::BIGINT AS {col}" for col in summed_columns(spec))
+    name = rollup_name(spec["table"], level)
+    return [
+        f"""CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS
+            SELECT {keys}, {sums} FROM {spec['table']} GROUP BY {keys}""",
+        # the unique index allows REFRESH ... CONCURRENTLY, readers are not blocked
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_key ON {name} ({keys})",
+    ]
+
+
+def build_rollups(connection, table_names=None, concurrently=True):
+    # creates the missing rollups and refreshes the existing ones
+    specs = [TABLES_BY_NAME[name] for name in table_names] if table_names else TABLES
+    for spec in specs:
+        names = [rollup_name(spec["table"], level) for level in ROLLUPS]
+        with connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""SELECT matviewname FROM pg_matviews
+                    WHERE schemaname = current_schema() AND matviewname = ANY(%s)""", (names,))
+                existing = {row[0] for row in cursor.fetchall()}
+                for level in ROLLUPS:
+                    name = rollup_name(spec["table"], level)
+                    if name in existing:
+                        mode = " CONCURRENTLY" if concurrently else ""
+                        cursor.execute(f"REFRESH MATERIALIZED VIEW{mode} {name}")
+                    else:
+                        for statement in rollup_sql(spec, level):
+                            cursor.execute(statement)
+                mark_loaded(cursor, names)
+        print(f"{spec['table']}: rollups {', '.join(names)} refreshed")
@@ -0,0 +1,67 @@
+import io
+
+import pandas as pd
+
+from Pulse_tables import TABLES_BY_NAME, measure_columns
+from Rollups import rollup_name, summed_columns
+
+# compact, typed DataFrames for the dashboard process: query results are
+# streamed with COPY ... TO STDOUT and parsed by pandas straight into
+# categorical strings, int16 year / int8 quarter and int64 / float64 measures,
+# instead of lists of python tuples turned into object columns. The frames
+# are kept in the process-wide query cache (Query_layer.fetch_frame), so every
+# session of a dashboard worker shares one copy.
+
+SMALL_INTS = {"year": "int16", "quater": "int8", "state_id": "int16"}
+
+
+def typed(df):
+    # small ints for the key columns, categoricals for every string column;
+    # measures keep the int64 / float64 pandas parsed them into
+    for col in df.columns:
+        if col in SMALL_INTS and not df[col].hasnans:
+            df[col] = df[col].astype(SMALL_INTS[col])
+        elif df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def copy_frame(cursor, query, params=None):
+    # one query through COPY TO STDOUT (csv), parsed in C by read_csv
+    sql = cursor.mogrify(query, params).decode() if params else query
+    buffer = io.StringIO()
+    cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+    buffer.seek(0)
+    # only empty fields are NULL, a district called "NA" stays a string
+    return typed(pd.read_csv(buffer, keep_default_na=False, na_values=[""]))
+
+
+def fact_sql(table):
+    # every row of a fact table with the state display name instead of the id
+    spec = TABLES_BY_NAME[table]
+    columns = ", ".join(f"f.{col}" for col in ["year", "quater", spec["area"]] + measure_columns(spec))
+    return f"SELECT s.display_name AS state, {columns} FROM {table} f JOIN dim_state s ON s.id = f.state_id"
+
+
+def fact_frame(table):
+    # shared typed copy of a whole fact table, reloaded after the table changes
+    from Query_layer import fetch_frame
+    return fetch_frame(fact_sql(table))
+
+
+def state_rollup_sql(table):
+    # the <table>_by_state rollup with the state display name instead of the id
+    columns = ", ".join(f"r.{col}" for col in ["year", "quater"] + summed_columns(TABLES_BY_NAME[table]))
+    return f"""SELECT s.display_name AS state, {columns}
+        FROM {rollup_name(table, 'by_state')} r JOIN dim_state s ON s.id = r.state_id"""
+
+
+def state_rollup_frame(table):
+    # shared typed copy of a table's state x quarter rollup (~36 rows a quarter)
+    from Query_layer import fetch_frame
+    return fetch_frame(state_rollup_sql(table))
+
+
+def frame_memory(df):
+    # deep memory use in bytes, categories and strings included
+    return int(df.memory_usage(deep=True).sum())
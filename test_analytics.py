@@ -0,0 +1,66 @@
+import math
+
+import pandas as pd
+import pytest
+
+import Analytics
+
+# registered users of two states from a hand-built top_user_by_state frame;
+# Kerala has no 2021 Q3 row, Goa overtakes Kerala in 2021 Q2 and falls back
+# behind it in 2022 Q1
+ROWS = [
+    ("Kerala", 2021, 1, 100),
+    ("Kerala", 2021, 2, 200),
+    ("Kerala", 2021, 4, 300),
+    ("Kerala", 2022, 1, 600),
+    ("Goa", 2021, 1, 50),
+    ("Goa", 2021, 2, 300),
+    ("Goa", 2021, 3, 10),
+    ("Goa", 2021, 4, 400),
+    ("Goa", 2022, 1, 500),
+]
+
+
+@pytest.fixture(autouse=True)
+def rollup_frame(monkeypatch):
+    frame = pd.DataFrame(ROWS, columns=["state", "year", "quater", "registered_users"])
+    monkeypatch.setattr(Analytics, "state_rollup_frame", lambda table: frame)
+
+
+def row(df, state, year, quater):
+    match = df[(df["state"] == state) & (df["year"] == year) & (df["quater"] == quater)]
+    assert len(match) == 1
+    return match.iloc[0]
+
+
+def test_lags_do_not_cross_a_missing_quarter():
+    df = Analytics.compute_trends("top_user", "state")
+    # the quarter before 2021 Q4 is missing, 2021 Q2 is not its previous quarter
+    assert math.isnan(row(df, "Kerala", 2021, 4)["registered_users_qoq"])
+    assert row(df, "Kerala", 2022, 1)["registered_users_qoq"] == pytest.approx(600 / 300 - 1)
+    # same quarter a year earlier
+    assert row(df, "Kerala", 2022, 1)["registered_users_yoy"] == pytest.approx(600 / 100 - 1)
+    assert row(df, "Goa", 2022, 1)["registered_users_yoy"] == pytest.approx(500 / 50 - 1)
+    assert math.isnan(row(df, "Goa", 2021, 4)["registered_users_yoy"])
+    # the moving average leaves out the missing quarter
+    assert row(df, "Kerala", 2022, 1)["registered_users_ma4"] == pytest.approx((600 + 300 + 200) / 3)
+
+
+def test_rank_change_is_places_gained():
+    df = Analytics.compute_trends("top_user", "state")
+    assert row(df, "Goa", 2021, 2)["registered_users_rank"] == 1
+    assert row(df, "Goa", 2021, 2)["registered_users_rank_change"] == 1
+    assert row(df, "Kerala", 2021, 2)["registered_users_rank_change"] == -1
+    assert row(df, "Kerala", 2022, 1)["registered_users_rank_change"] == 1
+    assert row(df, "Goa", 2022, 1)["registered_users_rank_change"] == -1
+    # no rank in the missing previous quarter
+    assert math.isnan(row(df, "Kerala", 2021, 4)["registered_users_rank_change"])
+
+
+def test_national_level_and_cagr():
+    df = Analytics.compute_trends("top_user", "national")
+    assert df["registered_users"].tolist() == [150, 500, 10, 700, 1100]
+    assert df.loc[df["period_label"] == "2021 Q3", "registered_users_qoq"].iloc[0] == pytest.approx(10 / 500 - 1)
+    growth = Analytics.cagr(df, [], "registered_users").iloc[0]
+    assert growth["years"] == 1
+    assert growth["registered_users_cagr"] == pytest.approx(1100 / 150 - 1)
@@ -0,0 +1,84 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from Cube import Cube
+
+# a small sparse aggregation_trx frame: not every state has every type in
+# every quarter, and one (state, year, quater, type) key appears twice
+ROWS = [
+    ("Kerala", 2021, 1, "P2P", 10, 1000),
+    ("Kerala", 2021, 1, "Merchant", 5, 200),
+    ("Kerala", 2021, 2, "P2P", 12, 1300),
+    ("Kerala", 2022, 1, "Recharge", 3, 30),
+    ("Kerala", 2022, 1, "Recharge", 1, 10),
+    ("Goa", 2021, 1, "Merchant", 7, 700),
+    ("Goa", 2021, 2, "Merchant", 8, 650),
+    ("Goa", 2021, 2, "Recharge", 2, 40),
+    ("Goa", 2022, 2, "P2P", 20, 2500),
+]
+COLUMNS = ["state", "year", "quater", "transacion_type", "transacion_count", "transacion_amount"]
+DIMENSIONS = COLUMNS[:4]
+MEASURES = COLUMNS[4:]
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(ROWS, columns=COLUMNS)
+
+
+@pytest.fixture
+def data_cube(frame):
+    return Cube.from_frame("aggregation_trx", frame)
+
+
+def expected(frame, by):
+    return frame.groupby(by, as_index=False)[MEASURES].sum().sort_values(by).reset_index(drop=True)
+
+
+def actual(result, by):
+    return result[by + MEASURES].sort_values(by).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("by", [list(combo) for n in (1, 2) for combo in itertools.combinations(DIMENSIONS, n)])
+def test_rollup_matches_groupby(frame, data_cube, by):
+    pd.testing.assert_frame_equal(actual(data_cube.rollup(by), by), expected(frame, by), check_dtype=False)
+
+
+def test_rollup_keeps_the_order_of_by(frame, data_cube):
+    by = ["transacion_type", "state"]
+    result = data_cube.rollup(by)
+    assert list(result.columns[:2]) == by
+    pd.testing.assert_frame_equal(actual(result, by), expected(frame, by), check_dtype=False)
+
+
+def test_rollup_total_and_shares(frame, data_cube):
+    total = data_cube.rollup()
+    assert total["transacion_count"].tolist() == [frame["transacion_count"].sum()]
+    by_state = data_cube.rollup(["state"])
+    assert by_state["transacion_amount_share"].sum() == pytest.approx(1.0)
+
+
+def test_dice_matches_filtered_groupby(frame, data_cube):
+    diced = data_cube.dice(year=2021, quater=[1, 2])
+    subset = frame[(frame["year"] == 2021) & frame["quater"].isin([1, 2])]
+    by = ["state", "transacion_type"]
+    pd.testing.assert_frame_equal(actual(diced.rollup(by), by), expected(subset, by), check_dtype=False)
+
+
+def test_slice_is_a_single_member_dice(frame, data_cube):
+    sliced = data_cube.slice("state", "Goa")
+    assert sliced.members["state"] == ["Goa"]
+    by = ["year", "quater"]
+    pd.testing.assert_frame_equal(actual(sliced.rollup(by), by), expected(frame[frame["state"] == "Goa"], by),
+                                  check_dtype=False)
+
+
+def test_unknown_dimension_or_member(data_cube):
+    with pytest.raises(ValueError):
+        data_cube.dice(district="Ernakulam")
+    with pytest.raises(ValueError):
+        data_cube.slice("state", "Atlantis")
+    with pytest.raises(ValueError):
+        data_cube.rollup(["brand"])